@@ -3,6 +3,28 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The read-heavy pages (home, listing detail, my bookings, booking summary)
+are async views, so under ASGI a worker keeps serving other renters while
+their queries run. Run the app with an ASGI server, for example:
+
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker -w 4 --bind 0.0.0.0:8000
+
+or ``uvicorn config.asgi:application --workers 4``. Leave
+``DATABASE_CONN_MAX_AGE`` at its default of 0 under ASGI (persistent
+connections are per-thread and leak with async requests); set
+``DATABASE_POOL=1`` for psycopg's pool (see config/database.py) or put a
+server-side pooler such as PgBouncer in front of the database.
+Never set ``DJANGO_ALLOW_ASYNC_UNSAFE`` in production.
+
+To compare against the WSGI deployment (``gunicorn config.wsgi:application
+-w 4 --threads 8``), run the same load against each:
+
+    python manage.py loadtest http://127.0.0.1:8000/ --concurrency 100 --requests 5000
+
+The gain comes from requests that wait on I/O (a networked database, slow
+clients). Pages that are CPU-bound on template rendering against a local
+SQLite file run as fast or faster on threaded WSGI workers.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from . import database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "marketplace.metrics.metrics_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -54,7 +58,8 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates, with render time recorded by marketplace.metrics
+        "BACKEND": "marketplace.metrics.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -73,12 +78,21 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
-}
+# DATABASE_URL selects PostgreSQL and DATABASE_REPLICA_URL adds a read
+# replica for the listing and search pages (see config/database.py and
+# marketplace.routers). Without them, a tuned local SQLite file is used.
+
+if os.environ.get("DATABASE_URL"):
+    DATABASES = {"default": database.postgres(os.environ["DATABASE_URL"])}
+else:
+    DATABASES = {"default": database.sqlite(BASE_DIR / "db.sqlite3", test_path=BASE_DIR / "test_db.sqlite3")}
+
+if os.environ.get("DATABASE_REPLICA_URL"):
+    DATABASES["replica"] = database.postgres(os.environ["DATABASE_REPLICA_URL"])
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+    REPLICA_DATABASE = "replica"
+
+DATABASE_ROUTERS = ["marketplace.routers.ReplicaRouter"]
 
 
 # Password validation
@@ -99,6 +113,57 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Set REDIS_URL in production so every worker shares fragments,
+# invalidations, hit counters, rate limits and 2FA challenges. The
+# local-memory fallback is per process; marketplace.W001 warns about it.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "cityparkr",
+    },
+}
+
+if os.environ.get("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    }
+
+# Sessions
+# https://docs.djangoproject.com/en/6.0/topics/http/sessions/
+# Session state travels in a signed cookie, so no request reads or writes
+# django_session and every worker process (see config/asgi.py) can read
+# every session, across restarts too. A cache-backed engine must point at
+# a shared cache; the marketplace.W001 check flags a per-process one.
+
+SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+
+# Pending two-step login challenges (see marketplace.challenges). Must be
+# a cache shared by every worker, or a login step served by another
+# worker fails.
+TWO_FACTOR_CACHE_ALIAS = "default"
+TWO_FACTOR_CODE_TTL = 300
+TWO_FACTOR_MAX_ATTEMPTS = 5
+
+# Login, 2FA and signup throttling (see marketplace.ratelimit).
+# Limits are (attempts, seconds) per client IP and per account.
+
+RATE_LIMIT_BACKEND = "cache"  # or "local" for per-process buckets
+RATE_LIMIT_CACHE_ALIAS = "default"
+RATE_LIMITS = {
+    "login": {"ip": (20, 60), "account": (5, 60)},
+    "login_code": {"ip": (20, 60), "account": (5, 60)},
+    "signup": {"ip": (5, 3600), "account": (3, 3600)},
+}
+
+# Per-listing fragment cache (cards and detail pages)
+FRAGMENT_CACHE_ALIAS = "default"
+FRAGMENT_CACHE_TIMEOUT = 600
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
@@ -106,15 +171,80 @@ STATIC_URL = "static/"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are streamed to temporary files with size caps enforced while
+# reading, so a request never buffers whole files in memory.
+FILE_UPLOAD_HANDLERS = ['marketplace.uploads.LimitedTemporaryFileUploadHandler']
+MAX_UPLOAD_FILE_SIZE = 10 * 1024 * 1024
+MAX_UPLOAD_REQUEST_SIZE = 60 * 1024 * 1024
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Google Maps API Key
 # Replace 'YOUR_API_KEY_HERE' with your actual Google Maps Geocoding API key
 GOOGLE_MAPS_API_KEY = 'YOUR_API_KEY_HERE'
 
+# Geocoding backend for listing addresses. The offline geocoder maps every
+# address to a stable point in Sofia; switch to
+# 'marketplace.geocoding.GoogleGeocoder' once the API key above is set.
+GEOCODING_BACKEND = 'marketplace.geocoding.OfflineGeocoder'
+
 # Auth settings
 LOGOUT_REDIRECT_URL = '/'
 LOGIN_REDIRECT_URL = '/'
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "no-reply@cityparkr.local"
+# To keep delivered mail on disk instead, use
+# "django.core.mail.backends.filebased.EmailBackend" with EMAIL_FILE_PATH.
+EMAIL_FILE_PATH = BASE_DIR / "sent_emails"
+
+# Outbound email queue, drained by `manage.py send_queued_mail --loop`
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_LEASE_SECONDS = 300
+
+# JSON API (marketplace.api): default and largest page size, also the
+# largest number of ids one batch request may name
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# Booking price tiers: (duration type, length in hours, price in hours at
+# the space's hourly rate). See marketplace.pricing.
+PRICE_TIERS = (
+    ("hour", 1, 1),
+    ("day", 24, 16),
+    ("month", 24 * 30, 16 * 20),
+    ("year", 24 * 365, 16 * 20 * 10),
+)
+
+# Pending requests no host has answered expire after this long
+# (see marketplace.lifecycle and the run_booking_scheduler command)
+PENDING_BOOKING_TTL_HOURS = 48
+
+# Closed or finished bookings move to the archive table after this many
+# days (`manage.py archive_bookings`); renters see them under history.
+ARCHIVE_BOOKINGS_AFTER_DAYS = 30
+
+# Format for the modern image variants made by `manage.py process_images`
+# ("WEBP" or "AVIF"); skipped if Pillow cannot encode it.
+IMAGE_MODERN_FORMAT = "WEBP"
+# How long a process_images worker holds the images it claimed
+IMAGE_LEASE_SECONDS = 300
+
+
+# Request metrics (see marketplace.metrics). Prometheus scrapes /metrics/
+# from these addresses; staff can also view it when logged in.
+
+SLOW_REQUEST_MS = 500
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "marketplace.slow_requests": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+    },
+}
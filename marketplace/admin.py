@@ -1,6 +1,74 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
 # Register your models here.
-from .models import ParkingSpace, Booking
+from .bookings import BookingActionError, approve, approve_rule, decline, delete_bookings, request_booking
+from .models import ParkingSpace, Booking, ArchivedBooking, OutboundEmail, RecurringBooking, SpaceDailyStats
 admin.site.register(ParkingSpace)
-admin.site.register(Booking)
+admin.site.register(ArchivedBooking)
+admin.site.register(OutboundEmail)
+
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    list_display = ('parking_space', 'renter', 'start_datetime', 'end_datetime', 'status')
+    list_filter = ('status',)
+    list_select_related = ('parking_space', 'renter')
+    actions = ('approve_bookings', 'decline_bookings')
+
+    def get_readonly_fields(self, request, obj=None):
+        # Status and the rolled-up fields only change through
+        # marketplace.bookings, which keeps SpaceDailyStats in step
+        if obj is None:
+            return ('quoted_price', 'status')
+        return ('parking_space', 'start_datetime', 'end_datetime', 'quoted_price', 'status')
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            super().save_model(request, obj, form, change)
+        else:
+            request_booking(obj)
+
+    def delete_model(self, request, obj):
+        delete_bookings([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        delete_bookings(queryset.values_list('pk', flat=True))
+
+    @admin.action(description="Approve selected bookings")
+    def approve_bookings(self, request, queryset):
+        for booking in queryset.select_related('parking_space'):
+            try:
+                approve(booking.pk, booking.parking_space.owner)
+            except BookingActionError as error:
+                self.message_user(request, f"{booking}: {error}", level=messages.ERROR)
+
+    @admin.action(description="Decline selected bookings")
+    def decline_bookings(self, request, queryset):
+        for booking in queryset.select_related('parking_space'):
+            decline(booking.pk, booking.parking_space.owner)
+
+
+@admin.register(SpaceDailyStats)
+class SpaceDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('parking_space', 'day', 'approved_hours', 'pending_count', 'revenue')
+    list_filter = ('day',)
+    list_select_related = ('parking_space',)
+    date_hierarchy = 'day'
+    # Maintained by marketplace.rollups; edit bookings, or run rebuild_rollups
+    readonly_fields = ('parking_space', 'day', 'approved_minutes', 'pending_count', 'revenue')
+
+
+@admin.register(RecurringBooking)
+class RecurringBookingAdmin(admin.ModelAdmin):
+    list_display = ('parking_space', 'renter', 'weekdays', 'start_time', 'end_time', 'active_from', 'active_until', 'status')
+    list_filter = ('status',)
+    list_select_related = ('parking_space', 'renter')
+    actions = ('approve_rules',)
+
+    @admin.action(description="Approve selected recurring bookings")
+    def approve_rules(self, request, queryset):
+        for rule in queryset.select_related('parking_space'):
+            try:
+                approve_rule(rule.pk, rule.parking_space.owner)
+            except BookingActionError as error:
+                self.message_user(request, f"{rule}: {error}", level=messages.ERROR)
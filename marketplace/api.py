@@ -0,0 +1,261 @@
+"""
+Versioned JSON read API, mounted at ``/api/v1/``.
+
+- ``spaces/``: available listings, newest first; ``?ids=3,5,8`` fetches a
+  batch of listings instead.
+- ``spaces/<pk>/``: one listing.
+- ``images/?spaces=3,5``: images of one or more listings.
+- ``availability/?spaces=3,5&start=YYYY-MM-DD&days=N``: quarter-hour
+  occupancy bitmaps (see marketplace.occupancy).
+- ``bookings/``: the signed-in caller's bookings, optionally ``?status=``.
+- ``bookings/recurring/``: the caller's recurring bookings, likewise.
+
+Lists page with ``?cursor=`` and ``?limit=`` (keyset pagination, see
+marketplace.pagination) and answer ``{"results": [...], "next_cursor": ...}``.
+``?fields=id,title`` returns only those fields, and the query loads only
+the columns and relations they need, so every endpoint runs a fixed
+number of queries whatever the page size. Responses are gzipped for
+clients that accept it.
+"""
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from . import occupancy
+from .models import Booking, ParkingImage, ParkingSpace, RecurringBooking, cover_images_prefetch
+from .pagination import keyset_page
+from .routers import read_from_replica
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(frozen=True)
+class Field:
+    get: Callable
+    only: tuple = ()
+    select: tuple = ()
+    prefetch: tuple = ()
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _cover_url(space):
+    return space.cover_images[0].card_url if space.cover_images else None
+
+
+SPACE_FIELDS = {
+    'id': Field(lambda space: space.pk),
+    'title': Field(lambda space: space.title, only=('title',)),
+    'description': Field(lambda space: space.description, only=('description',)),
+    'location': Field(lambda space: space.location, only=('location',)),
+    'price_per_hour': Field(lambda space: str(space.price_per_hour), only=('price_per_hour',)),
+    'latitude': Field(lambda space: space.latitude, only=('latitude',)),
+    'longitude': Field(lambda space: space.longitude, only=('longitude',)),
+    'is_available': Field(lambda space: space.is_available, only=('is_available',)),
+    'owner': Field(lambda space: space.owner.username, only=('owner__username',), select=('owner',)),
+    'cover_image': Field(_cover_url, prefetch=(cover_images_prefetch(),)),
+    'updated_at': Field(lambda space: _isoformat(space.updated_at), only=('updated_at',)),
+}
+SPACE_DEFAULT_FIELDS = ('id', 'title', 'location', 'price_per_hour', 'latitude', 'longitude', 'owner', 'cover_image')
+
+IMAGE_FIELDS = {
+    'id': Field(lambda image: image.pk),
+    'parking_space': Field(lambda image: image.parking_space_id, only=('parking_space_id',)),
+    'url': Field(lambda image: image.image.url, only=('image',)),
+    'thumbnail_url': Field(lambda image: image.thumbnail_url, only=('image', 'thumbnail')),
+    'card_url': Field(lambda image: image.card_url, only=('image', 'card')),
+}
+IMAGE_DEFAULT_FIELDS = tuple(IMAGE_FIELDS)
+
+BOOKING_FIELDS = {
+    'id': Field(lambda booking: booking.pk),
+    'parking_space': Field(lambda booking: booking.parking_space_id, only=('parking_space_id',)),
+    'parking_space_title': Field(
+        lambda booking: booking.parking_space.title, only=('parking_space__title',), select=('parking_space',),
+    ),
+    'start': Field(lambda booking: _isoformat(booking.start_datetime), only=('start_datetime',)),
+    'end': Field(lambda booking: _isoformat(booking.end_datetime), only=('end_datetime',)),
+    'duration_type': Field(lambda booking: booking.duration_type, only=('duration_type',)),
+    'quoted_price': Field(lambda booking: str(booking.quoted_price), only=('quoted_price',)),
+    'status': Field(lambda booking: booking.status, only=('status',)),
+    'created_at': Field(lambda booking: _isoformat(booking.created_at), only=('created_at',)),
+}
+BOOKING_DEFAULT_FIELDS = tuple(BOOKING_FIELDS)
+
+RULE_FIELDS = {
+    'id': Field(lambda rule: rule.pk),
+    'parking_space': BOOKING_FIELDS['parking_space'],
+    'parking_space_title': BOOKING_FIELDS['parking_space_title'],
+    # Bit 0 is Monday
+    'weekdays': Field(lambda rule: rule.weekdays, only=('weekdays',)),
+    'start_time': Field(lambda rule: rule.start_time.strftime('%H:%M'), only=('start_time',)),
+    'end_time': Field(lambda rule: rule.end_time.strftime('%H:%M'), only=('end_time',)),
+    'active_from': Field(lambda rule: _isoformat(rule.active_from), only=('active_from',)),
+    'active_until': Field(lambda rule: _isoformat(rule.active_until), only=('active_until',)),
+    'status': BOOKING_FIELDS['status'],
+    'created_at': BOOKING_FIELDS['created_at'],
+}
+RULE_DEFAULT_FIELDS = tuple(RULE_FIELDS)
+
+
+def _page_size():
+    return getattr(settings, 'API_PAGE_SIZE', 50)
+
+
+def _max_page_size():
+    return getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+
+
+def _ids(request, name):
+    raw = request.GET.get(name, '')
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw.split(',') if value.strip()))
+    except ValueError:
+        raise ApiError(f"{name} must be a comma-separated list of ids.")
+    if len(ids) > _max_page_size():
+        raise ApiError(f"At most {_max_page_size()} ids per request.")
+    return ids
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', _page_size()))
+    except ValueError:
+        raise ApiError("limit must be a number.")
+    if not 1 <= limit <= _max_page_size():
+        raise ApiError(f"limit must be between 1 and {_max_page_size()}.")
+    return limit
+
+
+def _fields(request, available, default):
+    if 'fields' not in request.GET:
+        return default
+    names = [name.strip() for name in request.GET['fields'].split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}.")
+    return list(dict.fromkeys(names)) or default
+
+
+def _shape(queryset, available, names):
+    """Restrict ``queryset`` to the columns and relations the chosen fields read."""
+    fields = [available[name] for name in names]
+    only = [column for field in fields for column in field.only]
+    queryset = queryset.only(*only) if only else queryset.only('pk')
+    select = [relation for field in fields for relation in field.select]
+    prefetch = [lookup for field in fields for lookup in field.prefetch]
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def _serialize(objects, available, names):
+    getters = [(name, available[name].get) for name in names]
+    return [{name: get(obj) for name, get in getters} for obj in objects]
+
+
+def _list(request, queryset, available, default):
+    names = _fields(request, available, default)
+    page = keyset_page(_shape(queryset, available, names), request.GET.get('cursor'), _limit(request))
+    return JsonResponse({'results': _serialize(page.items, available, names), 'next_cursor': page.next_cursor})
+
+
+def api_view(view):
+    """Wrap a read-only API view: GET only, gzip, and JSON errors."""
+    @require_GET
+    @gzip_page
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+    return inner
+
+
+@api_view
+@read_from_replica
+def spaces(request):
+    queryset = ParkingSpace.objects.all()
+    if 'ids' in request.GET:
+        queryset = queryset.filter(pk__in=_ids(request, 'ids'))
+    else:
+        queryset = queryset.filter(is_available=True)
+    return _list(request, queryset, SPACE_FIELDS, SPACE_DEFAULT_FIELDS)
+
+
+@api_view
+@read_from_replica
+def space_detail(request, pk):
+    names = _fields(request, SPACE_FIELDS, SPACE_DEFAULT_FIELDS)
+    space = _shape(ParkingSpace.objects.filter(pk=pk), SPACE_FIELDS, names).first()
+    if space is None:
+        raise ApiError("Not found.", status=404)
+    return JsonResponse(_serialize([space], SPACE_FIELDS, names)[0])
+
+
+@api_view
+@read_from_replica
+def images(request):
+    space_ids = _ids(request, 'spaces')
+    if not space_ids:
+        raise ApiError("spaces is required.")
+    return _list(request, ParkingImage.objects.filter(parking_space_id__in=space_ids), IMAGE_FIELDS, IMAGE_DEFAULT_FIELDS)
+
+
+@api_view
+def availability(request):
+    # Not on the replica: missing occupancy rows are built and saved on read
+    space_ids = _ids(request, 'spaces')
+    if not space_ids:
+        raise ApiError("spaces is required.")
+    try:
+        first_day, last_day = occupancy.requested_range(request.GET.get('start'), request.GET.get('days', 7))
+    except ValueError as error:
+        raise ApiError(str(error))
+
+    found = list(ParkingSpace.objects.filter(pk__in=space_ids).values_list('pk', flat=True))
+    bitmaps = occupancy.get_occupancy_many(found, first_day, last_day)
+    return JsonResponse({
+        'slot_minutes': occupancy.SLOT_MINUTES,
+        'results': [
+            {
+                'parking_space': space_id,
+                'days': [{'date': day.isoformat(), 'slots': slots} for day, slots in bitmaps[space_id].items()],
+            }
+            for space_id in space_ids if space_id in bitmaps
+        ],
+    })
+
+
+def _callers(request, model):
+    if not request.user.is_authenticated:
+        raise ApiError("Authentication required.", status=401)
+    queryset = model.objects.filter(renter=request.user)
+    if 'status' in request.GET:
+        queryset = queryset.filter(status=request.GET['status'])
+    return queryset
+
+
+@api_view
+def bookings(request):
+    return _list(request, _callers(request, Booking), BOOKING_FIELDS, BOOKING_DEFAULT_FIELDS)
+
+
+@api_view
+def recurring_bookings(request):
+    return _list(request, _callers(request, RecurringBooking), RULE_FIELDS, RULE_DEFAULT_FIELDS)
+
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class MarketplaceConfig(AppConfig):
     name = "marketplace"
+
+    def ready(self):
+        # Connect the signal handlers that keep indexes and caches in sync, and the system checks
+        from . import checks, fragment_cache, freshness, metrics, occupancy, pricing, search  # noqa: F401
@@ -0,0 +1,51 @@
+"""
+Move cold bookings out of the hot Booking table.
+
+A booking is cold once nothing can happen to it any more: declined,
+cancelled or expired and untouched for ``ARCHIVE_BOOKINGS_AFTER_DAYS``, or
+completed and ended that long ago. ``archive_cold_bookings`` walks Booking
+in primary key order and, chunk by chunk, copies cold rows into
+ArchivedBooking and deletes them in the same transaction, so the hot table
+(conflict checks, approvals, the host dashboard) only holds live and
+recent bookings. History stays readable through ``my_bookings?history=1``.
+Daily rollups are unaffected: they are per day, not per booking, and
+``rebuild_rollups`` reads both tables.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedBooking, Booking
+
+ARCHIVED_FIELDS = [
+    'id', 'parking_space_id', 'renter_id', 'start_datetime', 'end_datetime',
+    'duration_type', 'quoted_price', 'status', 'created_at', 'updated_at',
+]
+
+
+def cold_bookings(now=None):
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=getattr(settings, 'ARCHIVE_BOOKINGS_AFTER_DAYS', 30))
+    return Booking.objects.filter(
+        Q(status__in=('declined', 'cancelled', 'expired'), updated_at__lt=cutoff)
+        | Q(status='completed', end_datetime__lt=cutoff)
+    )
+
+
+def archive_cold_bookings(now=None, batch_size=1000):
+    """Archive every cold booking in chunks of ``batch_size``; return how many moved."""
+    cold = cold_bookings(now)
+    moved = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(cold.filter(pk__gt=last_pk).order_by('pk').values(*ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                return moved
+            ArchivedBooking.objects.bulk_create([ArchivedBooking(**row) for row in rows])
+            Booking.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+        last_pk = rows[-1]['id']
@@ -0,0 +1,268 @@
+"""
+Booking status transitions that must be race-free.
+
+Approvals for the same ParkingSpace are serialized by locking the space row
+(``SELECT ... FOR UPDATE`` on PostgreSQL) inside a transaction, so the
+conflict check and the status write happen atomically. SQLite has no row
+locks; there the database runs transactions in IMMEDIATE mode (see
+``DATABASES`` in settings), which takes the write lock when the transaction
+begins and gives the same guarantee.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import occupancy, rollups
+from .models import Booking, ParkingSpace, RecurringBooking
+from .recurrence import conflicting_rules, overlaps, rule_intervals, rules_collide
+
+
+class BookingActionError(Exception):
+    pass
+
+
+def approve(booking_id, host):
+    """
+    Approve a pending booking on one of ``host``'s spaces.
+
+    Raises Booking.DoesNotExist if the booking is not on the host's spaces,
+    and BookingActionError if it is no longer pending or conflicts with an
+    approved booking.
+    """
+    with transaction.atomic():
+        space_id = Booking.objects.filter(pk=booking_id, parking_space__owner=host).values_list(
+            'parking_space_id', flat=True
+        ).get()
+        # Every approval for this space queues here until we commit
+        _lock_space(space_id)
+
+        booking = Booking.objects.get(pk=booking_id)
+        if booking.status != 'pending':
+            raise BookingActionError("Cannot approve: this request is no longer pending.")
+
+        conflicts = Booking.objects.approved_overlapping(
+            space_id, booking.start_datetime, booking.end_datetime
+        ).exclude(pk=booking.pk)
+        if conflicts.exists() or conflicting_rules(space_id, booking.start_datetime, booking.end_datetime):
+            raise BookingActionError("Cannot approve: Conflict with another approved booking.")
+
+        booking.status = 'approved'
+        booking.save()
+        rollups.record([(booking, 'pending', 'approved')])
+        return booking
+
+
+def _lock_space(space_id):
+    ParkingSpace.objects.select_for_update().filter(pk=space_id).get()
+
+
+def decline(booking_id, host):
+    """Decline one of ``host``'s bookings; raises Booking.DoesNotExist otherwise."""
+    with transaction.atomic():
+        booking = Booking.objects.get(pk=booking_id, parking_space__owner=host)
+        _lock_space(booking.parking_space_id)
+        booking.refresh_from_db(fields=['status'])
+        old_status = booking.status
+        booking.status = 'declined'
+        booking.save()
+        rollups.record([(booking, old_status, 'declined')])
+        return booking
+
+
+def cancel(booking_id, renter):
+    """
+    Cancel one of ``renter``'s pending requests. Raises Booking.DoesNotExist
+    if it is not theirs and BookingActionError if it is no longer pending.
+    """
+    with transaction.atomic():
+        booking = Booking.objects.get(pk=booking_id, renter=renter)
+        _lock_space(booking.parking_space_id)
+        booking.refresh_from_db(fields=['status'])
+        if booking.status != 'pending':
+            raise BookingActionError("Cannot cancel this booking.")
+        booking.status = 'cancelled'
+        booking.save()
+        rollups.record([(booking, 'pending', 'cancelled')])
+        return booking
+
+
+def request_booking(booking):
+    """Save a new pending ``booking`` and count it in the rollups."""
+    with transaction.atomic():
+        _lock_space(booking.parking_space_id)
+        booking.status = 'pending'
+        booking.save()
+        rollups.record([(booking, None, 'pending')])
+        return booking
+
+
+def delete_bookings(booking_ids):
+    """Delete bookings and take them out of the rollups (an admin-only operation)."""
+    with transaction.atomic():
+        bookings = Booking.objects.filter(pk__in=booking_ids)
+        space_ids = set(bookings.values_list('parking_space_id', flat=True))
+        list(ParkingSpace.objects.select_for_update().filter(pk__in=space_ids).order_by('pk'))
+        bookings = list(bookings)
+        rollups.record([(booking, booking.status, None) for booking in bookings])
+        Booking.objects.filter(pk__in=[booking.pk for booking in bookings]).delete()
+        return len(bookings)
+
+
+def approve_rule(rule_id, host):
+    """
+    Approve a pending RecurringBooking on one of ``host``'s spaces.
+
+    Raises RecurringBooking.DoesNotExist if the rule is not on the host's
+    spaces, and BookingActionError if it is no longer pending or would
+    overlap an approved booking or another approved rule.
+    """
+    with transaction.atomic():
+        space_id = RecurringBooking.objects.filter(pk=rule_id, parking_space__owner=host).values_list(
+            'parking_space_id', flat=True
+        ).get()
+        _lock_space(space_id)
+
+        rule = RecurringBooking.objects.get(pk=rule_id)
+        if rule.status != 'pending':
+            raise BookingActionError("Cannot approve: this request is no longer pending.")
+
+        # Each approved booking in the rule's lifetime is checked over its own interval only
+        bookings = Booking.objects.filter(parking_space_id=space_id, status='approved', end_datetime__gt=rule.active_from)
+        if rule.active_until:
+            bookings = bookings.filter(start_datetime__lt=rule.active_until)
+        for start, end in bookings.values_list('start_datetime', 'end_datetime').iterator():
+            if overlaps(rule, start, end):
+                raise BookingActionError("Cannot approve: Conflict with another approved booking.")
+
+        others = RecurringBooking.objects.approved_active(rule.active_from, rule.active_until)
+        for other in others.filter(parking_space_id=space_id):
+            if rules_collide(rule, other):
+                raise BookingActionError("Cannot approve: Conflict with another recurring booking.")
+
+        rule.status = 'approved'
+        rule.save()
+        return rule
+
+
+def decline_rule(rule_id, host):
+    """Decline one of ``host``'s recurring bookings; raises RecurringBooking.DoesNotExist otherwise."""
+    with transaction.atomic():
+        rule = RecurringBooking.objects.get(pk=rule_id, parking_space__owner=host)
+        _lock_space(rule.parking_space_id)
+        rule.status = 'declined'
+        rule.save()
+        return rule
+
+
+def cancel_rule(rule_id, renter):
+    """
+    Cancel one of ``renter``'s pending or approved recurring bookings. An
+    approved rule has no natural end, so the renter may end it at any time.
+    Raises RecurringBooking.DoesNotExist if it is not theirs and
+    BookingActionError if it is already closed.
+    """
+    with transaction.atomic():
+        rule = RecurringBooking.objects.get(pk=rule_id, renter=renter)
+        _lock_space(rule.parking_space_id)
+        rule.refresh_from_db(fields=['status'])
+        if rule.status not in ('pending', 'approved'):
+            raise BookingActionError("Cannot cancel this booking.")
+        rule.status = 'cancelled'
+        rule.save()
+        return rule
+
+
+def _overlaps(start, end, intervals):
+    return any(start < other_end and end > other_start for other_start, other_end in intervals)
+
+
+def bulk_transition(booking_ids, host, action):
+    """
+    Approve or decline many of ``host``'s bookings in one transaction.
+
+    Returns ``{booking_id: result}`` where result is the new status, or one
+    of ``'not_found'``, ``'not_pending'`` and ``'conflict'``. Approvals are
+    granted oldest request first; a request that overlaps an approved
+    booking, or one approved earlier in the same batch, is left pending.
+    """
+    if action not in ('approve', 'decline'):
+        raise ValueError(f"Unknown bulk action: {action}")
+
+    results = {booking_id: 'not_found' for booking_id in booking_ids}
+    with transaction.atomic():
+        bookings = Booking.objects.filter(pk__in=booking_ids, parking_space__owner=host)
+        space_ids = set(bookings.values_list('parking_space_id', flat=True))
+        # Lock the affected spaces in a stable order, as approve() does per
+        # space, and only then read the statuses we act on
+        list(ParkingSpace.objects.select_for_update().filter(pk__in=space_ids).order_by('pk').values_list('pk'))
+        candidates = list(
+            bookings.only('pk', 'parking_space_id', 'status', 'start_datetime', 'end_datetime', 'quoted_price')
+            .order_by('created_at', 'pk')
+        )
+
+        pending = []
+        for booking in candidates:
+            if booking.status == 'pending':
+                pending.append(booking)
+            else:
+                results[booking.pk] = 'not_pending'
+
+        if action == 'decline':
+            accepted = [booking.pk for booking in pending]
+            new_status = 'declined'
+        else:
+            accepted = _grant_non_overlapping(pending, results)
+            new_status = 'approved'
+
+        Booking.objects.filter(pk__in=accepted, status='pending').update(status=new_status, updated_at=timezone.now())
+        for booking_id in accepted:
+            results[booking_id] = new_status
+
+        accepted_ids = set(accepted)
+        changed = [booking for booking in pending if booking.pk in accepted_ids]
+        rollups.record([(booking, 'pending', new_status) for booking in changed])
+        if action == 'approve':
+            # update() skips the post_save hook that maintains the occupancy index
+            for space_id, (lo, hi) in _span_by_space(changed).items():
+                occupancy.refresh(space_id, lo, hi)
+    return results
+
+
+def _span_by_space(bookings):
+    """Return ``{space_id: (earliest start, latest end)}`` for ``bookings``."""
+    span = {}
+    for booking in bookings:
+        lo, hi = span.get(booking.parking_space_id, (booking.start_datetime, booking.end_datetime))
+        span[booking.parking_space_id] = (min(lo, booking.start_datetime), max(hi, booking.end_datetime))
+    return span
+
+
+def _grant_non_overlapping(pending, results):
+    # One query for every approved booking that could collide with the batch
+    span = _span_by_space(pending)
+
+    condition = Q()
+    for space_id, (lo, hi) in span.items():
+        condition |= Q(parking_space_id=space_id, end_datetime__gt=lo, start_datetime__lt=hi)
+
+    taken = defaultdict(list)
+    if span:
+        for space_id, start, end in Booking.objects.filter(condition, status='approved').values_list(
+            'parking_space_id', 'start_datetime', 'end_datetime'
+        ):
+            taken[space_id].append((start, end))
+        # Recurring rules only expand over each space's span in this batch
+        for space_id, intervals in rule_intervals(span).items():
+            taken[space_id].extend(intervals)
+
+    accepted = []
+    for booking in pending:
+        intervals = taken[booking.parking_space_id]
+        if _overlaps(booking.start_datetime, booking.end_datetime, intervals):
+            results[booking.pk] = 'conflict'
+            continue
+        intervals.append((booking.start_datetime, booking.end_datetime))
+        accepted.append(booking.pk)
+    return accepted
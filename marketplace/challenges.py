@@ -0,0 +1,63 @@
+"""
+Short-lived challenges for the two-step login.
+
+``login_step_one`` issues a challenge and keeps only its random id in the
+session; the code and the attempt counter live in the cache named by
+``TWO_FACTOR_CACHE_ALIAS`` and expire after ``TWO_FACTOR_CODE_TTL``
+seconds. Attempts are counted with an atomic ``incr``, and a challenge is
+discarded after ``TWO_FACTOR_MAX_ATTEMPTS`` wrong codes or one right one.
+"""
+import hmac
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[getattr(settings, 'TWO_FACTOR_CACHE_ALIAS', 'default')]
+
+
+def _keys(challenge_id):
+    return f'2fa:{challenge_id}', f'2fa:{challenge_id}:attempts'
+
+
+def issue(user):
+    """Create a challenge for ``user`` and return ``(challenge_id, code)``."""
+    challenge_id = secrets.token_urlsafe(24)
+    code = f'{secrets.randbelow(10**6):06d}'
+    ttl = getattr(settings, 'TWO_FACTOR_CODE_TTL', 300)
+    key, attempts_key = _keys(challenge_id)
+    _cache().set_many({key: (user.pk, code), attempts_key: 0}, timeout=ttl)
+    return challenge_id, code
+
+
+def is_active(challenge_id):
+    return bool(challenge_id) and _cache().get(_keys(challenge_id)[0]) is not None
+
+
+def verify(challenge_id, code):
+    """
+    Check ``code`` against the challenge. Returns the user id on success and
+    None when the code is wrong or the challenge has expired or run out of
+    attempts.
+    """
+    if not challenge_id:
+        return None
+    cache = _cache()
+    key, attempts_key = _keys(challenge_id)
+    try:
+        attempts = cache.incr(attempts_key)
+    except ValueError:
+        return None
+    stored = cache.get(key)
+    if stored is None:
+        return None
+
+    user_id, expected = stored
+    if hmac.compare_digest(code.encode(), expected.encode()):
+        cache.delete_many([key, attempts_key])
+        return user_id
+    if attempts >= getattr(settings, 'TWO_FACTOR_MAX_ATTEMPTS', 5):
+        cache.delete_many([key, attempts_key])
+    return None
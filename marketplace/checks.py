@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _per_process(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') in PER_PROCESS_CACHES
+
+
+@register()
+def login_state_is_shared(app_configs, **kwargs):
+    # Sessions and 2FA challenges in a per-process cache differ between
+    # workers, so a login step served by another worker fails, and they
+    # vanish on restart
+    hint = "Use a cache shared by all workers (Redis, Memcached; see REDIS_URL in settings)."
+    warnings = []
+    if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.cache' and _per_process(settings.SESSION_CACHE_ALIAS):
+        warnings.append(Warning(
+            f"Sessions are stored in the per-process cache {settings.SESSION_CACHE_ALIAS!r}.",
+            hint=f"{hint} Or use the signed_cookies session engine.",
+            id='marketplace.W001',
+        ))
+    alias = getattr(settings, 'TWO_FACTOR_CACHE_ALIAS', 'default')
+    if _per_process(alias):
+        warnings.append(Warning(
+            f"Pending two-step login challenges are stored in the per-process cache {alias!r}.",
+            hint=hint,
+            id='marketplace.W001',
+        ))
+    return warnings
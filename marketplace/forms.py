@@ -2,8 +2,10 @@ from django import forms
 from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
-import requests
+from PIL import Image
+from .geocoding import GeocodingError, geocode
 from .models import ParkingSpace, ParkingImage, Booking
+from .recurrence import conflicting_rules
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
@@ -42,6 +44,8 @@ class CustomDateTimeWidget(forms.MultiWidget):
 
     def decompress(self, value):
         if isinstance(value, datetime):
+            if timezone.is_aware(value):
+                value = timezone.localtime(value)
             return [value.date(), value.hour, value.minute]
         return [None, None, None]
 
@@ -58,10 +62,10 @@ class CustomDateTimeField(forms.MultiValueField):
 
     def compress(self, data_list):
         if data_list:
-            # Combine date, hour, and minute into a single datetime object
-            return datetime.combine(data_list[0], datetime.min.time()).replace(
+            # Combine date, hour, and minute into an aware datetime in the current timezone
+            return timezone.make_aware(datetime.combine(data_list[0], datetime.min.time()).replace(
                 hour=data_list[1], minute=data_list[2]
-            )
+            ))
         return None
 
 # --- Existing Forms ---
@@ -73,12 +77,14 @@ class ParkingSpaceForm(forms.ModelForm):
 
     def clean_location(self):
         location = self.cleaned_data.get('location')
-        api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', None)
-
-        if not api_key or api_key == 'YOUR_API_KEY_HERE':
-            return location
-
-        # ... (rest of the location validation)
+        try:
+            coordinates = geocode(location)
+        except GeocodingError:
+            raise forms.ValidationError("We couldn't look up this address right now. Please try again in a moment.")
+        if coordinates is None:
+            raise forms.ValidationError("We couldn't find this address. Please check the location.")
+
+        self.instance.latitude, self.instance.longitude = coordinates
         return location
 
 class MultipleFileInput(forms.ClearableFileInput):
@@ -100,12 +106,50 @@ class MultipleFileField(forms.FileField):
 class ParkingSpaceImageForm(forms.Form):
     images = MultipleFileField(label='Select images', required=True)
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        # Files dropped by the upload handler for exceeding size limits
+        self.upload_errors = upload_errors or []
+        super().__init__(*args, **kwargs)
+
     def clean_images(self):
+        if self.upload_errors:
+            raise forms.ValidationError(self.upload_errors)
+
         images = self.files.getlist('images')
         if len(images) < 3:
             raise forms.ValidationError("You must upload at least 3 images.")
+
+        for image in images:
+            # verify() reads from the spooled file, not a full in-memory copy
+            try:
+                with Image.open(image) as img:
+                    img.verify()
+            except Exception:
+                raise forms.ValidationError(f"{image.name} is not a valid image.")
+            finally:
+                image.seek(0)
         return images
 
+class SearchForm(forms.Form):
+    q = forms.CharField(required=False, max_length=100)
+    start = forms.DateTimeField(required=False, widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}))
+    end = forms.DateTimeField(required=False, widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}))
+    min_price = forms.DecimalField(required=False, min_value=0, max_digits=6, decimal_places=2)
+    max_price = forms.DecimalField(required=False, min_value=0, max_digits=6, decimal_places=2)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+        if start and end and end <= start:
+            raise forms.ValidationError("End time must be after start time.")
+
+        min_price = cleaned_data.get('min_price')
+        max_price = cleaned_data.get('max_price')
+        if min_price is not None and max_price is not None and max_price < min_price:
+            raise forms.ValidationError("Maximum price must not be below minimum price.")
+        return cleaned_data
+
 class BookingForm(forms.ModelForm):
     start_datetime = CustomDateTimeField(label="Start Time")
     end_datetime = CustomDateTimeField(label="End Time")
@@ -126,10 +170,7 @@ class BookingForm(forms.ModelForm):
         if not start_datetime:
              return cleaned_data
 
-        # Make datetime timezone-aware before comparison
-        aware_start_datetime = timezone.make_aware(start_datetime)
-
-        if aware_start_datetime < timezone.now():
+        if start_datetime < timezone.now():
             raise forms.ValidationError("You cannot book a parking space in the past.")
 
         if not end_datetime:
@@ -140,13 +181,8 @@ class BookingForm(forms.ModelForm):
 
         # Conflict check
         if self.parking_space:
-            conflicts = Booking.objects.filter(
-                parking_space=self.parking_space,
-                status='approved',
-                start_datetime__lt=end_datetime,
-                end_datetime__gt=start_datetime
-            )
-            if conflicts.exists():
+            conflicts = Booking.objects.approved_overlapping(self.parking_space, start_datetime, end_datetime)
+            if conflicts.exists() or conflicting_rules(self.parking_space, start_datetime, end_datetime):
                 raise forms.ValidationError("This parking space is already booked for the selected dates.")
 
         return cleaned_data
@@ -0,0 +1,136 @@
+"""
+Per-listing template fragment cache.
+
+Fragments are stored under a key that includes the listing's current cache
+version. Editing, archiving or deleting a ParkingSpace, or changing one of
+its images, bumps that version, so stale fragments are never served and
+simply expire. Hit and miss counters per fragment name live in the same
+cache, so they are shared by every worker when the backend is.
+
+A page of cards calls ``prime`` first, which fetches every card's version
+and content with one ``get_many`` each and counts the page's hits and
+misses in one update per outcome; ``render_cached`` then only touches the
+cache to store the cards that missed.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import metrics
+from .models import ParkingImage, ParkingSpace
+
+STATS_KEY = 'fragment-stats:{name}:{outcome}'
+STATS_NAMES_KEY = 'fragment-stats:names'
+
+
+def get_cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+def _version_key(space_id):
+    return f'fragment-version:{space_id}'
+
+
+def _fragment_key(name, space_id, version):
+    return f'fragment:{name}:{space_id}:v{version}'
+
+
+def fragment_key(name, space_id, cache=None):
+    return _fragment_key(name, space_id, (cache or get_cache()).get(_version_key(space_id), 0))
+
+
+def versions(space_ids, cache=None):
+    """Return ``{space_id: version}`` for many listings in one cache round trip."""
+    stored = (cache or get_cache()).get_many([_version_key(space_id) for space_id in space_ids])
+    return {space_id: stored.get(_version_key(space_id), 0) for space_id in space_ids}
+
+
+def invalidate(space_id):
+    cache = get_cache()
+    key = _version_key(space_id)
+    # add() is a no-op if the key exists; incr() is atomic on shared backends
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def _count(cache, name, outcome, n=1):
+    if not n:
+        return
+    metrics.record_cache(outcome, n)
+    key = STATS_KEY.format(name=name, outcome=outcome)
+    if cache.add(key, n, timeout=None):
+        names = cache.get(STATS_NAMES_KEY, set())
+        if name not in names:
+            cache.set(STATS_NAMES_KEY, names | {name}, timeout=None)
+        return
+    try:
+        cache.incr(key, n)
+    except ValueError:
+        cache.set(key, n, timeout=None)
+
+
+def prime(name, space_ids):
+    """
+    Look up the ``name`` fragment of many listings at once and count the
+    hits and misses. Returns ``{space_id: (key, content or None)}`` for
+    ``render_cached``.
+    """
+    cache = get_cache()
+    keys = {space_id: _fragment_key(name, space_id, version) for space_id, version in versions(space_ids, cache).items()}
+    found = cache.get_many(keys.values())
+    hits = sum(key in found for key in keys.values())
+    _count(cache, name, 'hits', hits)
+    _count(cache, name, 'misses', len(keys) - hits)
+    return {space_id: (key, found.get(key)) for space_id, key in keys.items()}
+
+
+def render_cached(name, space_id, render, primed=None):
+    """
+    Return the cached fragment, or call ``render()`` and cache its output.
+    ``primed`` is the result of ``prime``; listings in it were already
+    looked up and counted.
+    """
+    cache = get_cache()
+    if primed is not None and space_id in primed:
+        key, content = primed[space_id]
+        if content is not None:
+            return content
+    else:
+        key = fragment_key(name, space_id, cache)
+        content = cache.get(key)
+        if content is not None:
+            _count(cache, name, 'hits')
+            return content
+        _count(cache, name, 'misses')
+
+    content = render()
+    cache.set(key, content, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600))
+    return content
+
+
+def stats():
+    """Return ``{name: {'hits': n, 'misses': n, 'hit_rate': ratio}}``."""
+    cache = get_cache()
+    result = {}
+    for name in sorted(cache.get(STATS_NAMES_KEY, set())):
+        hits = cache.get(STATS_KEY.format(name=name, outcome='hits'), 0)
+        misses = cache.get(STATS_KEY.format(name=name, outcome='misses'), 0)
+        total = hits + misses
+        result[name] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else None}
+    return result
+
+
+@receiver(post_save, sender=ParkingSpace, dispatch_uid='fragment_cache_space_saved')
+@receiver(post_delete, sender=ParkingSpace, dispatch_uid='fragment_cache_space_deleted')
+def _space_changed(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+@receiver(post_save, sender=ParkingImage, dispatch_uid='fragment_cache_image_saved')
+@receiver(post_delete, sender=ParkingImage, dispatch_uid='fragment_cache_image_deleted')
+def _image_changed(sender, instance, **kwargs):
+    invalidate(instance.parking_space_id)
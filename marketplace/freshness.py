@@ -0,0 +1,116 @@
+"""
+ETag and Last-Modified validators for conditional GETs.
+
+Each validator is one cheap aggregate query. When the client's copy is
+current, Django's ``condition`` decorator answers ``304 Not Modified``
+before the view runs its full queries or renders anything. Pages show
+per-user navigation, so every ETag includes the requesting user.
+
+The validators are coroutines for the async views. Django's ``condition``
+calls its validators synchronously, so those views use ``acondition``.
+A request carrying queued ``django.contrib.messages`` (typically the
+redirect after a failed POST) always gets a full, unvalidated response,
+since the messages are not part of any ETag.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Booking, ParkingImage, ParkingSpace, RecurringBooking
+
+
+def _etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+async def _user_key(request):
+    user = await request.auser()
+    return user.pk if user.is_authenticated else 'anon'
+
+
+def _has_messages(request):
+    # len() loads the stored messages without marking them as seen
+    return len(messages.get_messages(request)) > 0
+
+
+def acondition(etag_func=None, last_modified_func=None):
+    """``django.views.decorators.http.condition`` for async views and validators."""
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            if await sync_to_async(_has_messages)(request):
+                # No validators either, so the page with the messages is never reused
+                return await view(request, *args, **kwargs)
+            last_modified = None
+            if last_modified_func and (moment := await last_modified_func(request, *args, **kwargs)):
+                last_modified = int(moment.timestamp())
+            etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            etag = quote_etag(etag) if etag is not None else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
+
+
+async def home_etag(request, *args, **kwargs):
+    # Count catches deletions, which leave no newer timestamp behind
+    listings = await ParkingSpace.objects.filter(is_available=True).aaggregate(
+        count=Count('pk'), latest=Max('updated_at'),
+    )
+    parts = [await _user_key(request), request.GET.urlencode(), listings['count'], listings['latest']]
+    if request.GET.get('start') and request.GET.get('end'):
+        # Availability filtering also depends on booking and recurring rule changes
+        parts.append((await Booking.objects.aaggregate(latest=Max('updated_at')))['latest'])
+        parts.append(await RecurringBooking.objects.aaggregate(count=Count('pk'), latest=Max('updated_at')))
+    return _etag(*parts)
+
+
+async def parking_detail_last_modified(request, pk, *args, **kwargs):
+    return await ParkingSpace.objects.filter(pk=pk).values_list('updated_at', flat=True).afirst()
+
+
+async def parking_detail_etag(request, pk, *args, **kwargs):
+    updated_at = await parking_detail_last_modified(request, pk)
+    if updated_at is None:
+        return None
+    return _etag(await _user_key(request), pk, updated_at)
+
+
+async def my_bookings_etag(request, *args, **kwargs):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+    bookings = await Booking.objects.filter(renter=user).aaggregate(
+        count=Count('pk'),
+        latest=Max('updated_at'),
+        latest_space=Max('parking_space__updated_at'),
+    )
+    rules = await RecurringBooking.objects.filter(renter=user).aaggregate(count=Count('pk'), latest=Max('updated_at'))
+    # Archiving deletes from Booking, so the count also covers the history pages
+    return _etag(
+        user.pk, request.GET.urlencode(), bookings['count'], bookings['latest'], bookings['latest_space'],
+        rules['count'], rules['latest'],
+    )
+
+
+@receiver(post_save, sender=ParkingImage, dispatch_uid='freshness_image_saved')
+@receiver(post_delete, sender=ParkingImage, dispatch_uid='freshness_image_deleted')
+def _touch_space(sender, instance, **kwargs):
+    # Image changes alter the listing's pages, so they count as a listing change
+    ParkingSpace.objects.filter(pk=instance.parking_space_id).update(updated_at=timezone.now())
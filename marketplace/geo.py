@@ -0,0 +1,117 @@
+"""
+Geohash spatial index helpers and radius / nearest-N queries.
+
+Each ParkingSpace stores a geohash of its coordinates. A radius query picks
+the longest geohash prefix whose cell is at least as large as the search
+box, so the box overlaps at most 2x2 cells. Those prefixes become indexed
+range scans, and exact distances are only computed for the few
+candidates they return.
+"""
+import math
+
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return the (lat, lng) size in degrees of a geohash cell."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _wrap_lng(lng):
+    return (lng + 180.0) % 360.0 - 180.0
+
+
+def covering_prefixes(lat, lng, radius_km):
+    """Return the geohash prefixes whose cells cover a circle around a point."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+
+    precision = 0
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_size, lng_size = cell_size(candidate)
+        if lat_size >= 2 * dlat and lng_size >= 2 * dlng:
+            precision = candidate
+            break
+    if precision == 0:
+        # Search box is larger than any cell: scan everything
+        return {''}
+
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    west, east = _wrap_lng(lng - dlng), _wrap_lng(lng + dlng)
+    return {
+        encode(corner_lat, corner_lng, precision)
+        for corner_lat in (south, north)
+        for corner_lng in (west, east)
+    }
+
+
+def _prefix_filter(prefixes):
+    # Plain range bounds rather than LIKE, so every database can use the index
+    condition = Q()
+    for prefix in prefixes:
+        condition |= Q(geohash__gte=prefix, geohash__lte=prefix.ljust(GEOHASH_PRECISION, BASE32[-1]))
+    return condition
+
+
+def spaces_within(queryset, lat, lng, radius_km):
+    """Return ``[(space, distance_km), ...]`` within ``radius_km``, nearest first."""
+    candidates = queryset.exclude(geohash='').filter(_prefix_filter(covering_prefixes(lat, lng, radius_km)))
+    results = []
+    for space in candidates:
+        distance = haversine_km(lat, lng, space.latitude, space.longitude)
+        if distance <= radius_km:
+            results.append((space, distance))
+    results.sort(key=lambda item: item[1])
+    return results
+
+
+def nearest_spaces(queryset, lat, lng, limit=10, max_radius_km=50.0):
+    """Return up to ``limit`` nearest spaces, widening the search ring as needed."""
+    radius = min(1.0, max_radius_km)
+    while True:
+        results = spaces_within(queryset, lat, lng, radius)
+        if len(results) >= limit or radius >= max_radius_km:
+            return results[:limit]
+        radius = min(radius * 2, max_radius_km)
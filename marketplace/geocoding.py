@@ -0,0 +1,109 @@
+"""
+Pluggable address geocoding with a persistent result cache.
+
+The backend is selected with ``settings.GEOCODING_BACKEND`` (a dotted path,
+like ``EMAIL_BACKEND``). Every answer, including "no such address", is
+stored in GeocodeResult, so an address is only ever sent to the backend
+once. Backends raise GeocodingError when they cannot answer (network
+errors, quota, a rejected key); those are never cached.
+"""
+import hashlib
+import re
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import GeocodeResult
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_address(address):
+    return _WHITESPACE_RE.sub(' ', (address or '').strip().lower())
+
+
+class GeocodingError(Exception):
+    pass
+
+
+class BaseGeocoder:
+    def geocode(self, address):
+        """
+        Return ``(latitude, longitude)`` for ``address``, or None if not found.
+        Raise GeocodingError if the lookup itself failed.
+        """
+        raise NotImplementedError
+
+
+class OfflineGeocoder(BaseGeocoder):
+    """
+    Deterministic stand-in for local development and tests.
+
+    Maps each address to a stable point inside ``GEOCODING_OFFLINE_BOUNDS``
+    (south, west, north, east), which defaults to Sofia.
+    """
+
+    def __init__(self):
+        self.bounds = getattr(settings, 'GEOCODING_OFFLINE_BOUNDS', (42.62, 23.22, 42.75, 23.42))
+
+    def geocode(self, address):
+        if not address:
+            return None
+        digest = hashlib.sha256(address.encode('utf-8')).digest()
+        south, west, north, east = self.bounds
+        lat_fraction = int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF
+        lng_fraction = int.from_bytes(digest[4:8], 'big') / 0xFFFFFFFF
+        return (
+            round(south + (north - south) * lat_fraction, 6),
+            round(west + (east - west) * lng_fraction, 6),
+        )
+
+
+class GoogleGeocoder(BaseGeocoder):
+    url = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+    def __init__(self):
+        self.api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', None)
+
+    def geocode(self, address):
+        try:
+            response = requests.get(self.url, params={'address': address, 'key': self.api_key}, timeout=5)
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.RequestException, ValueError) as error:
+            raise GeocodingError(str(error)) from error
+
+        status = payload.get('status')
+        if status == 'ZERO_RESULTS':
+            return None
+        if status != 'OK' or not payload.get('results'):
+            # REQUEST_DENIED, OVER_QUERY_LIMIT, UNKNOWN_ERROR, ...: try again later
+            raise GeocodingError(f"{status}: {payload.get('error_message', '')}")
+        location = payload['results'][0]['geometry']['location']
+        return location['lat'], location['lng']
+
+
+def get_geocoder():
+    backend = getattr(settings, 'GEOCODING_BACKEND', 'marketplace.geocoding.OfflineGeocoder')
+    return import_string(backend)()
+
+
+def geocode(address, geocoder=None):
+    """
+    Return cached or freshly looked-up ``(latitude, longitude)``, or None.
+    GeocodingError from the backend propagates and nothing is cached.
+    """
+    query = normalize_address(address)
+    if not query:
+        return None
+
+    cached = GeocodeResult.objects.filter(query=query).first()
+    if cached is not None:
+        return cached.coordinates
+
+    coordinates = (geocoder or get_geocoder()).geocode(query)
+    latitude, longitude = coordinates if coordinates else (None, None)
+    # get_or_create tolerates another request caching the same address first
+    GeocodeResult.objects.get_or_create(query=query, defaults={'latitude': latitude, 'longitude': longitude})
+    return coordinates
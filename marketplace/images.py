@@ -0,0 +1,161 @@
+"""
+Off-request image processing.
+
+Uploaded ParkingImage rows start with ``processed_at`` unset. The
+``process_images`` management command picks them up and writes a square
+thumbnail and a card-size variant, each as JPEG and in a modern format
+(``IMAGE_MODERN_FORMAT``, WebP by default) when Pillow can encode it.
+Templates use the ``*_url`` properties, which fall back to the original
+until the variants exist.
+
+Workers claim rows under a lease (``IMAGE_LEASE_SECONDS``), so several can
+run side by side, and render each distinct upload (``content_hash``) once.
+"""
+import hashlib
+import io
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .models import ParkingImage
+
+THUMBNAIL_SIZE = (120, 120)
+CARD_WIDTH = 800
+JPEG_QUALITY = 82
+MODERN_QUALITY = 75
+
+_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'AVIF': 'avif'}
+
+
+def modern_format():
+    image_format = getattr(settings, 'IMAGE_MODERN_FORMAT', 'WEBP').upper()
+    if image_format not in _EXTENSIONS or not features.check(image_format.lower()):
+        return None
+    return image_format
+
+
+def _encode(image, image_format, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality, optimize=image_format == 'JPEG')
+    return buffer.getvalue()
+
+
+def _save_variant(field, stem, suffix, image, image_format, quality):
+    name = f"{stem}_{suffix}.{_EXTENSIONS[image_format]}"
+    field.save(name, ContentFile(_encode(image, image_format, quality)), save=False)
+
+
+def build_variants(parking_image):
+    """Render and attach every variant for ``parking_image`` (without saving the row)."""
+    with parking_image.image.open('rb') as source:
+        original = Image.open(source)
+        original = ImageOps.exif_transpose(original).convert('RGB')
+
+    thumbnail = ImageOps.fit(original, THUMBNAIL_SIZE, Image.LANCZOS)
+    card = original.copy()
+    if card.width > CARD_WIDTH:
+        card = card.resize((CARD_WIDTH, round(card.height * CARD_WIDTH / card.width)), Image.LANCZOS)
+
+    stem = os.path.splitext(os.path.basename(parking_image.image.name))[0]
+    _save_variant(parking_image.thumbnail, stem, 'thumb', thumbnail, 'JPEG', JPEG_QUALITY)
+    _save_variant(parking_image.card, stem, 'card', card, 'JPEG', JPEG_QUALITY)
+    image_format = modern_format()
+    if image_format:
+        _save_variant(parking_image.thumbnail_modern, stem, 'thumb', thumbnail, image_format, MODERN_QUALITY)
+        _save_variant(parking_image.card_modern, stem, 'card', card, image_format, MODERN_QUALITY)
+
+
+VARIANT_FIELDS = ('thumbnail', 'thumbnail_modern', 'card', 'card_modern')
+
+
+def content_hash(upload):
+    if getattr(upload, 'content_hash', None):
+        return upload.content_hash
+    sha256 = hashlib.sha256()
+    for chunk in upload.chunks():
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def store_upload(parking_space, upload):
+    """
+    Attach ``upload`` to ``parking_space``, reusing the stored file (and any
+    generated variants) of an identical image uploaded earlier.
+    """
+    digest = content_hash(upload)
+    existing = ParkingImage.objects.filter(content_hash=digest).order_by('pk').first()
+    if existing is None:
+        return ParkingImage.objects.create(parking_space=parking_space, image=upload, content_hash=digest)
+
+    duplicate = ParkingImage(
+        parking_space=parking_space,
+        image=existing.image.name,
+        content_hash=digest,
+        processed_at=existing.processed_at,
+        processing_error=existing.processing_error,
+    )
+    for field in VARIANT_FIELDS:
+        setattr(duplicate, field, getattr(existing, field).name)
+    duplicate.save()
+    return duplicate
+
+
+def _claim_batch(batch_size):
+    # Same scheme as the outbox: a lease hides claimed rows from other
+    # workers, and they become due again if this one dies
+    lease = timedelta(seconds=getattr(settings, 'IMAGE_LEASE_SECONDS', 300))
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            ParkingImage.objects.select_for_update(skip_locked=True)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lte=now), processed_at__isnull=True)
+            .order_by('pk')[:batch_size]
+        )
+        ParkingImage.objects.filter(pk__in=[image.pk for image in batch]).update(claimed_until=now + lease)
+    return batch
+
+
+def _render(parking_image):
+    before = {field: getattr(parking_image, field).name for field in VARIANT_FIELDS}
+    try:
+        build_variants(parking_image)
+        parking_image.processing_error = ''
+    except Exception as error:
+        # Drop the variants written before the failure, then keep serving the
+        # original rather than retrying a broken file forever
+        for field in VARIANT_FIELDS:
+            variant = getattr(parking_image, field)
+            if variant.name != before[field]:
+                variant.delete(save=False)
+                variant.name = before[field]
+        parking_image.processing_error = str(error)
+
+
+def process_pending(batch_size=20):
+    """Process up to ``batch_size`` unprocessed images; return how many were handled."""
+    batch = _claim_batch(batch_size)
+    # Copies of an upload share its variants, whether rendered earlier or in this batch
+    hashes = {parking_image.content_hash for parking_image in batch if parking_image.content_hash}
+    rendered = {
+        image.content_hash: image
+        for image in ParkingImage.objects.filter(content_hash__in=hashes, processed_at__isnull=False)
+    }
+    for parking_image in batch:
+        source = rendered.get(parking_image.content_hash)
+        if source is None:
+            _render(parking_image)
+            if parking_image.content_hash:
+                rendered[parking_image.content_hash] = parking_image
+        else:
+            for field in VARIANT_FIELDS:
+                setattr(parking_image, field, getattr(source, field).name)
+            parking_image.processing_error = source.processing_error
+        parking_image.processed_at = timezone.now()
+        parking_image.save(update_fields=[*VARIANT_FIELDS, 'processed_at', 'processing_error'])
+    return len(batch)
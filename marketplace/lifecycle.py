@@ -0,0 +1,62 @@
+"""
+Time-driven booking transitions, run by ``manage.py run_booking_scheduler``.
+
+Pending requests expire once they are older than ``PENDING_BOOKING_TTL_HOURS``
+or their start time has passed, and approved bookings become completed once
+they end. Each sweep walks a partial index that holds only live rows, in
+batches: every batch locks the affected spaces (as marketplace.bookings
+does), re-reads its rows, flips them with one UPDATE and applies the
+rollup deltas. Cost therefore tracks the live rows, not the booking history.
+
+Completing a booking frees no time: it is already past, so the occupancy
+index is left as is, and rollups keep counting it as approved.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import Booking, ParkingSpace
+
+
+def _sweep(queryset, order_by, old_status, new_status, batch_size):
+    changed = 0
+    while True:
+        with transaction.atomic():
+            candidates = list(queryset.order_by(order_by).values_list('pk', 'parking_space_id')[:batch_size])
+            if not candidates:
+                return changed
+            space_ids = {space_id for _, space_id in candidates}
+            list(ParkingSpace.objects.select_for_update().filter(pk__in=space_ids).order_by('pk').values_list('pk'))
+            # Re-read under the locks: a host may have acted on some of them meanwhile
+            batch = list(
+                Booking.objects.filter(pk__in=[pk for pk, _ in candidates], status=old_status)
+                .only('pk', 'parking_space_id', 'status', 'start_datetime', 'end_datetime', 'quoted_price')
+            )
+            Booking.objects.filter(pk__in=[booking.pk for booking in batch]).update(
+                status=new_status, updated_at=timezone.now()
+            )
+            rollups.record([(booking, old_status, new_status) for booking in batch])
+            changed += len(batch)
+            if len(candidates) < batch_size:
+                return changed
+
+
+def expire_pending(now=None, batch_size=1000):
+    """Expire stale or already-started pending requests; return how many."""
+    now = now or timezone.now()
+    ttl = timedelta(hours=getattr(settings, 'PENDING_BOOKING_TTL_HOURS', 48))
+    pending = Booking.objects.filter(status='pending')
+    return (
+        _sweep(pending.filter(created_at__lt=now - ttl), 'created_at', 'pending', 'expired', batch_size)
+        + _sweep(pending.filter(start_datetime__lte=now), 'start_datetime', 'pending', 'expired', batch_size)
+    )
+
+
+def complete_past(now=None, batch_size=1000):
+    """Mark approved bookings that have ended as completed; return how many."""
+    now = now or timezone.now()
+    ended = Booking.objects.filter(status='approved', end_datetime__lte=now)
+    return _sweep(ended, 'end_datetime', 'approved', 'completed', batch_size)
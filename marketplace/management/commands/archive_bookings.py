@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.archive import archive_cold_bookings
+
+
+class Command(BaseCommand):
+    help = "Move declined, cancelled, expired and long-finished bookings into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        moved = archive_cold_bookings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} bookings."))
@@ -0,0 +1,99 @@
+import random
+import statistics
+import time
+from datetime import time as clock, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from marketplace.models import Booking, ParkingSpace, RecurringBooking
+from marketplace.recurrence import conflicting_rules
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure booking conflict-check latency as the Booking table grows. "
+        "Runs inside a transaction that is rolled back, so no data is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--spaces', type=int, default=10, help="Spaces the bookings are spread over.")
+        parser.add_argument('--checks', type=int, default=500, help="Conflict checks timed per size.")
+        parser.add_argument('--rules', type=int, default=50, help="Open-ended recurring rules per space.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(0)
+        owner = User.objects.create(username='benchmark-conflicts-owner')
+        spaces = ParkingSpace.objects.bulk_create([
+            ParkingSpace(owner=owner, title=f'Bench {i}', description='', location='', price_per_hour=1)
+            for i in range(options['spaces'])
+        ])
+        now = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+        # Open-ended rules started years ago are active in every window; they must stay cheap.
+        RecurringBooking.objects.bulk_create([
+            RecurringBooking(
+                parking_space=space, renter=owner, status='approved', weekdays=1 << (i % 7),
+                start_time=clock(i % 24), end_time=clock((i + 1) % 24),
+                active_from=now - timedelta(days=365 * 5 + i),
+            )
+            for space in spaces for i in range(options['rules'])
+        ])
+
+        inserted = 0
+        self.stdout.write(f"{'bookings':>10}  {'median ms':>10}  {'p95 ms':>8}")
+        for size in sorted(options['sizes']):
+            # Historical bookings: hour-to-day slots over the past five years
+            batch = []
+            while inserted < size:
+                start = now - timedelta(hours=rng.randint(1, 24 * 365 * 5))
+                batch.append(Booking(
+                    parking_space=rng.choice(spaces), renter=owner,
+                    status=rng.choice(('approved', 'approved', 'approved', 'declined', 'cancelled')),
+                    start_datetime=start, end_datetime=start + timedelta(hours=rng.randint(1, 24)),
+                ))
+                inserted += 1
+                if len(batch) == 10_000:
+                    Booking.objects.bulk_create(batch)
+                    batch = []
+            Booking.objects.bulk_create(batch)
+            self._analyze()
+
+            timings = []
+            for _ in range(options['checks']):
+                start = now + timedelta(hours=rng.randint(1, 24 * 30))
+                began = time.perf_counter()
+                space = rng.choice(spaces)
+                Booking.objects.approved_overlapping(space, start, start + timedelta(hours=2)).exists()
+                conflicting_rules(space, start, start + timedelta(hours=2))
+                timings.append((time.perf_counter() - began) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(f"{size:>10}  {statistics.median(timings):>10.3f}  {p95:>8.3f}")
+
+        self._explain(spaces[0], now)
+
+    def _analyze(self):
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def _explain(self, space, now):
+        queryset = Booking.objects.approved_overlapping(space, now, now + timedelta(hours=2))
+        self.stdout.write("\nQuery plan:")
+        self.stdout.write(queryset.explain())
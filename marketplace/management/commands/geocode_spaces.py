@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.geocoding import geocode
+from marketplace.models import ParkingSpace
+
+
+class Command(BaseCommand):
+    help = "Geocode parking spaces that have no coordinates yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-geocode every space, not just missing ones.")
+
+    def handle(self, *args, **options):
+        spaces = ParkingSpace.objects.all()
+        if not options['all']:
+            spaces = spaces.filter(latitude__isnull=True)
+
+        located = missed = 0
+        for space in spaces.iterator():
+            coordinates = geocode(space.location)
+            if coordinates is None:
+                missed += 1
+                continue
+            space.latitude, space.longitude = coordinates
+            space.save(update_fields=['latitude', 'longitude', 'geohash'])
+            located += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Geocoded {located} spaces ({missed} not found)."))
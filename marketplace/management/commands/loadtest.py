@@ -0,0 +1,61 @@
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent GET requests to a running server and report throughput "
+        "and latency. Run it against the WSGI and ASGI deployments to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help="URLs to request, cycled in order.")
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--cookie', default='', help="Cookie header to send, e.g. 'sessionid=...'.")
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        urls = options['urls']
+        headers = {'Cookie': options['cookie']} if options['cookie'] else {}
+        counter = iter(range(options['requests']))
+        lock = threading.Lock()
+        timings, errors = [], []
+
+        def worker():
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                request = urllib.request.Request(urls[index % len(urls)], headers=headers)
+                began = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=options['timeout']) as response:
+                        response.read()
+                except (urllib.error.URLError, OSError) as exc:
+                    errors.append(exc)
+                    continue
+                timings.append((time.perf_counter() - began) * 1000)
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for _ in range(options['concurrency']):
+                pool.submit(worker)
+        elapsed = time.perf_counter() - began
+
+        if not timings:
+            self.stderr.write(f"All {len(errors)} requests failed: {errors[0] if errors else 'no requests'}")
+            return
+        timings.sort()
+        self.stdout.write(f"requests     {len(timings)} ok, {len(errors)} failed")
+        self.stdout.write(f"throughput   {len(timings) / elapsed:.1f} req/s")
+        self.stdout.write(f"median       {statistics.median(timings):.1f} ms")
+        for percentile in (95, 99):
+            self.stdout.write(f"p{percentile}          {timings[max(0, int(len(timings) * percentile / 100) - 1)]:.1f} ms")
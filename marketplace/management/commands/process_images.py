@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from marketplace.images import process_pending
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail and card variants for newly uploaded parking images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new uploads instead of exiting.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when nothing is pending.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_pending(options['batch_size'])
+            total += processed
+            if processed:
+                self.stdout.write(f"Processed {processed} images.")
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} images processed."))
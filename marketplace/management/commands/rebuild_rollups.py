@@ -0,0 +1,51 @@
+from collections import defaultdict
+from itertools import chain
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from marketplace.models import ArchivedBooking, Booking, ParkingSpace, SpaceDailyStats
+from marketplace.rollups import contributions
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-space daily booking rollups from the Booking table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--space', type=int, action='append', help="Only rebuild this space (repeatable).")
+
+    def handle(self, *args, **options):
+        spaces = ParkingSpace.objects.order_by('pk')
+        if options['space']:
+            spaces = spaces.filter(pk__in=options['space'])
+
+        rows = 0
+        for space in spaces.only('pk', 'price_per_hour').iterator():
+            rows += self._rebuild(space)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily rollup rows."))
+
+    def _rebuild(self, space):
+        with transaction.atomic():
+            # Hold the space lock so no transition lands between the scan and the write
+            ParkingSpace.objects.select_for_update().filter(pk=space.pk).get()
+
+            totals = defaultdict(lambda: [0, 0, Decimal(0)])
+            fields = ('parking_space_id', 'status', 'start_datetime', 'end_datetime', 'quoted_price')
+            live = Booking.objects.filter(parking_space=space, status__in=('pending', 'approved', 'completed'))
+            # Archived completed bookings still count towards revenue
+            archived = ArchivedBooking.objects.filter(parking_space=space, status='completed')
+            for booking in chain(live.only(*fields).iterator(chunk_size=2000), archived.only(*fields).iterator(chunk_size=2000)):
+                for day, values in contributions(booking, booking.status, space.price_per_hour).items():
+                    total = totals[day]
+                    for index, value in enumerate(values):
+                        total[index] += value
+
+            SpaceDailyStats.objects.filter(parking_space=space).delete()
+            SpaceDailyStats.objects.bulk_create([
+                SpaceDailyStats(
+                    parking_space=space, day=day, approved_minutes=minutes, pending_count=pending, revenue=revenue,
+                )
+                for day, (minutes, pending, revenue) in sorted(totals.items())
+            ], batch_size=500)
+        return len(totals)
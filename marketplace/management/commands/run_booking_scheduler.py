@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from marketplace.lifecycle import complete_past, expire_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire stale pending booking requests and mark ended bookings completed. "
+        "Runs once (for cron), or continuously with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--loop', action='store_true', help="Keep running instead of exiting.")
+        parser.add_argument('--interval', type=float, default=60.0, help="Seconds between runs with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_pending(batch_size=options['batch_size'])
+            completed = complete_past(batch_size=options['batch_size'])
+            self.stdout.write(f"Expired {expired} pending requests, completed {completed} bookings.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from marketplace.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound emails. Runs once, or continuously with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the queue instead of exiting.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            sent = deliver_batch(options['batch_size'])
+            total += sent
+            if sent:
+                self.stdout.write(f"Sent {sent} emails.")
+            if not options['loop']:
+                # Drain everything that is currently due, then exit
+                if sent == 0:
+                    break
+                continue
+            if sent < options['batch_size']:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} emails sent."))
@@ -0,0 +1,246 @@
+"""
+Per-request performance instrumentation.
+
+``metrics_middleware`` (first in ``MIDDLEWARE``) times every request and,
+through a context variable, collects what happened during it: database
+queries and their time (an execute wrapper installed on every connection),
+template render time (``TimedDjangoTemplates``, the template backend) and
+fragment cache hits and misses. No view needs to opt in.
+
+Each finished request is folded into in-process histograms per view, which
+``render_prometheus`` exposes in Prometheus' text format at ``/metrics/``.
+Every worker keeps its own, so scrape each worker separately. Requests
+slower than ``SLOW_REQUEST_MS`` are also written to the
+``marketplace.slow_requests`` logger as one JSON object per line.
+"""
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+from django.utils.decorators import sync_and_async_middleware
+
+slow_log = logging.getLogger('marketplace.slow_requests')
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    template_seconds: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+_current = ContextVar('request_stats', default=None)
+
+
+def record_cache(outcome, n=1):
+    """Count ``n`` fragment cache ``'hits'`` or ``'misses'`` against the current request."""
+    stats = _current.get()
+    if stats is not None:
+        if outcome == 'hits':
+            stats.cache_hits += n
+        else:
+            stats.cache_misses += n
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    began = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - began
+
+
+@receiver(connection_created, dispatch_uid='metrics_connection_created')
+def _instrument_connection(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects, so only add it once
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        began = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            if stats is not None:
+                stats.template_seconds += time.perf_counter() - began
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each top-level render."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class Registry:
+    histograms = {
+        'request_duration_seconds': ("Wall time per request.", SECONDS_BUCKETS),
+        'db_duration_seconds': ("Database time per request.", SECONDS_BUCKETS),
+        'template_render_seconds': ("Template render time per request.", SECONDS_BUCKETS),
+        'db_queries_per_request': ("Database queries per request.", QUERY_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.series = {name: {} for name in self.histograms}
+            self.requests = {}
+            self.cache = {}
+
+    def observe(self, view, status, seconds, stats):
+        values = {
+            'request_duration_seconds': seconds,
+            'db_duration_seconds': stats.db_seconds,
+            'template_render_seconds': stats.template_seconds,
+            'db_queries_per_request': stats.queries,
+        }
+        with self._lock:
+            for name, value in values.items():
+                series = self.series[name]
+                if view not in series:
+                    series[view] = Histogram(self.histograms[name][1])
+                series[view].observe(value)
+            key = (view, f'{status // 100}xx')
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for outcome, count in (('hit', stats.cache_hits), ('miss', stats.cache_misses)):
+                if count:
+                    self.cache[(view, outcome)] = self.cache.get((view, outcome), 0) + count
+
+
+registry = Registry()
+
+
+def _label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(fragment_stats=None):
+    """Return all metrics in the Prometheus text exposition format."""
+    lines = []
+    with registry._lock:
+        for name, (help_text, buckets) in registry.histograms.items():
+            lines += [f'# HELP cityparkr_{name} {help_text}', f'# TYPE cityparkr_{name} histogram']
+            for view, histogram in sorted(registry.series[name].items()):
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'cityparkr_{name}_bucket{{view="{_label(view)}",le="{bound}"}} {cumulative}')
+                lines.append(f'cityparkr_{name}_sum{{view="{_label(view)}"}} {_number(histogram.total)}')
+                lines.append(f'cityparkr_{name}_count{{view="{_label(view)}"}} {cumulative}')
+
+        lines += ['# HELP cityparkr_requests_total Requests by view and status class.',
+                  '# TYPE cityparkr_requests_total counter']
+        for (view, status), count in sorted(registry.requests.items()):
+            lines.append(f'cityparkr_requests_total{{view="{_label(view)}",status="{status}"}} {count}')
+
+        lines += ['# HELP cityparkr_fragment_cache_lookups_total Fragment cache lookups by view.',
+                  '# TYPE cityparkr_fragment_cache_lookups_total counter']
+        for (view, outcome), count in sorted(registry.cache.items()):
+            lines.append(f'cityparkr_fragment_cache_lookups_total{{view="{_label(view)}",outcome="{outcome}"}} {count}')
+
+    if fragment_stats:
+        # Totals kept in the shared cache, across all workers
+        lines += ['# HELP cityparkr_fragment_cache_events Fragment cache hits and misses by fragment, all workers.',
+                  '# TYPE cityparkr_fragment_cache_events counter']
+        for fragment, counts in sorted(fragment_stats.items()):
+            for outcome in ('hits', 'misses'):
+                lines.append(
+                    f'cityparkr_fragment_cache_events{{fragment="{_label(fragment)}",outcome="{outcome}"}} {counts[outcome]}'
+                )
+    return '\n'.join(lines) + '\n'
+
+
+def _finish(request, response, began, stats):
+    seconds = time.perf_counter() - began
+    match = request.resolver_match
+    view = match.view_name if match else '<unresolved>'
+    registry.observe(view, response.status_code, seconds, stats)
+
+    if seconds * 1000 >= getattr(settings, 'SLOW_REQUEST_MS', 500):
+        slow_log.warning(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': round(seconds * 1000, 1),
+            'queries': stats.queries,
+            'db_ms': round(stats.db_seconds * 1000, 1),
+            'template_ms': round(stats.template_seconds * 1000, 1),
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+        }))
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            stats = RequestStats()
+            token = _current.set(stats)
+            began = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            _finish(request, response, began, stats)
+            return response
+    else:
+        def middleware(request):
+            stats = RequestStats()
+            token = _current.set(stats)
+            began = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            _finish(request, response, began, stats)
+            return response
+    return middleware
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_fts_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+
+    ParkingSpace = apps.get_model('marketplace', 'ParkingSpace')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS marketplace_parkingspace_fts "
+            "USING fts5(title, description, location, tokenize='unicode61 remove_diacritics 2')"
+        )
+        for space in ParkingSpace.objects.using(connection.alias).iterator():
+            cursor.execute(
+                "INSERT INTO marketplace_parkingspace_fts (rowid, title, description, location) "
+                "VALUES (%s, %s, %s, %s)",
+                [space.pk, space.title, space.description, space.location],
+            )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS marketplace_parkingspace_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0004_rename_end_time_booking_end_datetime_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parkingspace',
+            index=models.Index(fields=['is_available', 'price_per_hour'], name='space_avail_price_idx'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=255, unique=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='parkingspace',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=9),
+        ),
+        migrations.AddField(
+            model_name='parkingspace',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='parkingspace',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
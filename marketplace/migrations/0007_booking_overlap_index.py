@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0006_space_coordinates_geocode_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['parking_space', 'end_datetime', 'start_datetime'], name='booking_approved_overlap_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0008_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingimage',
+            name='card',
+            field=models.ImageField(blank=True, upload_to='parking_images/variants/'),
+        ),
+        migrations.AddField(
+            model_name='parkingimage',
+            name='card_modern',
+            field=models.ImageField(blank=True, upload_to='parking_images/variants/'),
+        ),
+        migrations.AddField(
+            model_name='parkingimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='parkingimage',
+            name='processing_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='parkingimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='parking_images/variants/'),
+        ),
+        migrations.AddField(
+            model_name='parkingimage',
+            name='thumbnail_modern',
+            field=models.ImageField(blank=True, upload_to='parking_images/variants/'),
+        ),
+        migrations.AddIndex(
+            model_name='parkingimage',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='image_unprocessed_idx'),
+        ),
+    ]
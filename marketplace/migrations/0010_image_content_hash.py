@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0009_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0010_image_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('slots', models.CharField(max_length=96)),
+                ('parking_space', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='marketplace.parkingspace')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('parking_space', 'day'), name='unique_space_day_occupancy')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0011_day_occupancy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingspace',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='parkingspace',
+            index=models.Index(fields=['is_available', 'updated_at'], name='space_avail_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0012_space_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpaceDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('approved_minutes', models.IntegerField(default=0)),
+                ('pending_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('parking_space', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='marketplace.parkingspace')),
+            ],
+            options={
+                'verbose_name_plural': 'space daily stats',
+                'constraints': [models.UniqueConstraint(fields=('parking_space', 'day'), name='unique_space_daily_stats')],
+            },
+        ),
+    ]
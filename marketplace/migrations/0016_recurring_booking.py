@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:49
+
+from datetime import time
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def forever_bookings_to_rules(apps, schema_editor):
+    # A "forever" booking was ten years of rows in every range scan; it becomes
+    # an open-ended, all-day rule from the same start.
+    Booking = apps.get_model('marketplace', 'Booking')
+    RecurringBooking = apps.get_model('marketplace', 'RecurringBooking')
+    forever = Booking.objects.filter(duration_type='forever')
+    RecurringBooking.objects.bulk_create([
+        RecurringBooking(
+            parking_space_id=booking.parking_space_id, renter_id=booking.renter_id, weekdays=0b1111111,
+            start_time=time(0), end_time=time(0), active_from=booking.start_datetime, status=booking.status,
+        )
+        for booking in forever.iterator()
+    ])
+    forever.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0015_archived_booking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedbooking',
+            name='duration_type',
+            field=models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('month', 'Month'), ('year', 'Year')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='duration_type',
+            field=models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('month', 'Month'), ('year', 'Year')], default='hour', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='RecurringBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.PositiveSmallIntegerField(default=127)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('active_from', models.DateTimeField()),
+                ('active_until', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('declined', 'Declined'), ('cancelled', 'Cancelled'), ('expired', 'Expired'), ('completed', 'Completed')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('parking_space', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_bookings', to='marketplace.parkingspace')),
+                ('renter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_bookings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'approved')), fields=['parking_space', 'active_from'], name='recurring_approved_idx')],
+            },
+        ),
+        migrations.RunPython(forever_bookings_to_rules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:07
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Frozen copy of marketplace.pricing as of this migration: (name, length in
+# hours, price in hours at the hourly rate)
+PRICE_TIERS = (
+    ('hour', 1, 1),
+    ('day', 24, 16),
+    ('month', 24 * 30, 16 * 20),
+    ('year', 24 * 365, 16 * 20 * 10),
+)
+
+
+def _charge(minutes, tiers):
+    length, price = tiers[-1]
+    if len(tiers) == 1:
+        return Decimal(minutes) / length * price
+    units, rest = divmod(minutes, length)
+    rest_cost = _charge(rest, tiers[:-1])
+    if rest and rest_cost >= price:
+        units, rest_cost = units + 1, Decimal(0)
+    return units * price + rest_cost
+
+
+def charged_hours(start, end):
+    minutes = max(0, round((end - start).total_seconds() / 60))
+    return _charge(minutes, [(length * 60, Decimal(price)) for _, length, price in PRICE_TIERS])
+
+
+def snapshot_existing_prices(apps, schema_editor):
+    # Existing bookings were never quoted; the current rate is the best available
+    for name in ('Booking', 'ArchivedBooking'):
+        model = apps.get_model('marketplace', name)
+        batch = []
+        for booking in model.objects.select_related('parking_space').iterator(chunk_size=2000):
+            hours = charged_hours(booking.start_datetime, booking.end_datetime)
+            booking.quoted_price = (booking.parking_space.price_per_hour * hours).quantize(Decimal('0.01'))
+            batch.append(booking)
+            if len(batch) == 2000:
+                model.objects.bulk_update(batch, ['quoted_price'])
+                batch = []
+        model.objects.bulk_update(batch, ['quoted_price'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0016_recurring_booking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='quoted_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='quoted_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(snapshot_existing_prices, migrations.RunPython.noop),
+    ]
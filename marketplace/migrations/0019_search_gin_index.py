@@ -0,0 +1,33 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# Frozen copy of marketplace.search.search_vector(); queries only use the
+# index while both expressions are identical
+SEARCH_INDEX = GinIndex(
+    SearchVector('title', 'description', 'location', config='simple'), name='space_search_gin_idx',
+)
+
+
+def create_search_index(apps, schema_editor):
+    # SQLite searches its FTS5 table (0005); other databases have no index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('marketplace', 'ParkingSpace'), SEARCH_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('marketplace', 'ParkingSpace'), SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0018_booking_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:14
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0019_search_gin_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recurringbooking',
+            name='weekdays',
+            field=models.PositiveSmallIntegerField(default=127, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(127)]),
+        ),
+        migrations.AddConstraint(
+            model_name='recurringbooking',
+            constraint=models.CheckConstraint(condition=models.Q(('weekdays__range', (1, 127))), name='recurring_weekdays_range'),
+        ),
+    ]
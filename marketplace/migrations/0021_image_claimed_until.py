@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0020_recurring_weekdays_range'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingimage',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
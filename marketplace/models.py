@@ -1,7 +1,53 @@
+import calendar
+
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Greatest, Least
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import timedelta
+
+from . import geo
+
+def cover_images_prefetch(lookup='images'):
+    """Prefetch only the first image of each space into ``cover_images``."""
+    return models.Prefetch(lookup, queryset=ParkingImage.objects.order_by('pk')[:1], to_attr='cover_images')
+
+
+class ParkingSpaceQuerySet(models.QuerySet):
+    def for_cards(self):
+        # Owner and a single cover image per space, in two queries total
+        return self.select_related('owner').prefetch_related(cover_images_prefetch())
+
+    def with_booking_stats(self, now, window_end):
+        """
+        Annotate per-listing booking counts by status, approved time inside
+        ``[now, window_end)`` and all remaining approved time, in one query.
+        """
+        now_value = models.Value(now, output_field=models.DateTimeField())
+        window_end_value = models.Value(window_end, output_field=models.DateTimeField())
+        approved_upcoming = models.Q(bookings__status='approved', bookings__end_datetime__gt=now)
+        counts = {
+            f'{status}_count': models.Count('bookings', filter=models.Q(bookings__status=status))
+            for status, _ in Booking.STATUS_CHOICES
+        }
+        return self.annotate(
+            **counts,
+            window_booked_time=models.Sum(
+                models.ExpressionWrapper(
+                    Least(models.F('bookings__end_datetime'), window_end_value)
+                    - Greatest(models.F('bookings__start_datetime'), now_value),
+                    output_field=models.DurationField(),
+                ),
+                filter=approved_upcoming & models.Q(bookings__start_datetime__lt=window_end),
+            ),
+            remaining_booked_time=models.Sum(
+                models.ExpressionWrapper(
+                    models.F('bookings__end_datetime') - Greatest(models.F('bookings__start_datetime'), now_value),
+                    output_field=models.DurationField(),
+                ),
+                filter=approved_upcoming,
+            ),
+        )
 
 class ParkingSpace(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -10,23 +56,94 @@ class ParkingSpace(models.Model):
     location = models.CharField(max_length=100)
     price_per_hour = models.DecimalField(max_digits=6, decimal_places=2)
     is_available = models.BooleanField(default=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=geo.GEOHASH_PRECISION, blank=True, default='', db_index=True)
+    # Bumped on every save and by image changes; drives conditional GETs
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ParkingSpaceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_available', 'price_per_hour'], name='space_avail_price_idx'),
+            models.Index(fields=['is_available', 'updated_at'], name='space_avail_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.location})"
 
+    def save(self, *args, **kwargs):
+        # Keep the spatial index key in step with the coordinates
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        super().save(*args, **kwargs)
+
+    @property
+    def cover_image(self):
+        if hasattr(self, 'cover_images'):
+            return self.cover_images[0] if self.cover_images else None
+        return self.images.order_by('pk').first()
+
 class ParkingImage(models.Model):
     parking_space = models.ForeignKey(ParkingSpace, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='parking_images/')
+    # SHA-256 of the uploaded bytes; identical uploads share one stored file
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Resized variants, filled in by the process_images worker. The JPEG
+    # variants work everywhere; the modern ones are WebP or AVIF.
+    thumbnail = models.ImageField(upload_to='parking_images/variants/', blank=True)
+    thumbnail_modern = models.ImageField(upload_to='parking_images/variants/', blank=True)
+    card = models.ImageField(upload_to='parking_images/variants/', blank=True)
+    card_modern = models.ImageField(upload_to='parking_images/variants/', blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    processing_error = models.TextField(blank=True)
+    # Lease taken by the worker processing this image; others skip it until then
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='image_unprocessed_idx'),
+        ]
 
     def __str__(self):
         return f"Image for {self.parking_space.title}"
 
+    @property
+    def thumbnail_url(self):
+        return (self.thumbnail or self.image).url
+
+    @property
+    def card_url(self):
+        return (self.card or self.image).url
+
+    @property
+    def modern_content_type(self):
+        name = (self.card_modern or self.thumbnail_modern).name
+        if name.endswith('.avif'):
+            return 'image/avif'
+        return 'image/webp'
+
+class BookingQuerySet(models.QuerySet):
+    def approved_overlapping(self, parking_space, start, end):
+        # Served by booking_approved_overlap_idx; see Booking.Meta
+        return self.filter(
+            parking_space=parking_space,
+            status='approved',
+            end_datetime__gt=start,
+            start_datetime__lt=end,
+        )
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('approved', 'Approved'),
         ('declined', 'Declined'),
         ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
+        ('completed', 'Completed'),
     ]
 
     DURATION_CHOICES = [
@@ -34,7 +151,6 @@ class Booking(models.Model):
         ('day', 'Day'),
         ('month', 'Month'),
         ('year', 'Year'),
-        ('forever', 'Forever'),
     ]
 
     parking_space = models.ForeignKey(ParkingSpace, related_name='bookings', on_delete=models.CASCADE)
@@ -42,15 +158,204 @@ class Booking(models.Model):
     start_datetime = models.DateTimeField()
     end_datetime = models.DateTimeField()
     duration_type = models.CharField(max_length=10, choices=DURATION_CHOICES, default='hour')
+    # Total quoted when the booking was first saved (see marketplace.pricing);
+    # revenue keeps this price even if the host edits the hourly rate later
+    quoted_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
-        if self.duration_type == 'forever' and not self.end_datetime:
-             # Set end_datetime to 10 years from start if 'forever' is chosen
-             self.end_datetime = self.start_datetime + timedelta(days=365*10)
-        super().save(*args, **kwargs)
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Conflict checks are "approved, same space, ends after the new
+            # start, starts before the new end". Leading with end_datetime
+            # means the range scan skips every booking that finished before
+            # the requested window, so cost tracks current and future bookings
+            # rather than lifetime volume. Open-ended reservations are
+            # RecurringBooking rules, never rows here. The partial condition
+            # keeps the index limited to approved rows.
+            models.Index(
+                fields=['parking_space', 'end_datetime', 'start_datetime'],
+                condition=models.Q(status='approved'),
+                name='booking_approved_overlap_idx',
+            ),
+            # The scheduler's sweeps (see marketplace.lifecycle) only ever
+            # look at the few live rows, never the history.
+            models.Index(fields=['created_at'], condition=models.Q(status='pending'), name='booking_pending_created_idx'),
+            models.Index(fields=['start_datetime'], condition=models.Q(status='pending'), name='booking_pending_start_idx'),
+            models.Index(fields=['end_datetime'], condition=models.Q(status='approved'), name='booking_approved_end_idx'),
+            # Filtered home page ETags take the latest change across all
+            # bookings (see marketplace.freshness); this keeps that one seek.
+            models.Index(fields=['updated_at'], name='booking_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.parking_space.title} - {self.renter.username} ({self.start_datetime.date()} to {self.end_datetime.date()})"
+
+class RecurringBookingQuerySet(models.QuerySet):
+    def approved_active(self, start, end=None):
+        # Approved rules whose active period overlaps [start, end); end=None is open-ended
+        queryset = self.filter(status='approved').filter(
+            models.Q(active_until__isnull=True) | models.Q(active_until__gt=start)
+        )
+        return queryset if end is None else queryset.filter(active_from__lt=end)
+
+class RecurringBooking(models.Model):
+    # A repeating or open-ended reservation stored as one rule instead of
+    # materialized rows: on every weekday in ``weekdays`` (bit 0 = Monday),
+    # from start_time to end_time local time, within [active_from,
+    # active_until). An end_time at or before start_time runs past midnight,
+    # so 00:00-00:00 every day is a continuous reservation. Occurrences are
+    # only expanded over the window being checked (marketplace.recurrence).
+    EVERY_DAY = 0b1111111
+    WEEKDAYS = 0b0011111
+
+    parking_space = models.ForeignKey(ParkingSpace, related_name='recurring_bookings', on_delete=models.CASCADE)
+    renter = models.ForeignKey(User, related_name='recurring_bookings', on_delete=models.CASCADE)
+    weekdays = models.PositiveSmallIntegerField(
+        default=EVERY_DAY, validators=[MinValueValidator(1), MaxValueValidator(EVERY_DAY)],
+    )
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    active_from = models.DateTimeField()
+    active_until = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecurringBookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['parking_space', 'active_from'],
+                condition=models.Q(status='approved'),
+                name='recurring_approved_idx',
+            ),
+        ]
+        constraints = [
+            # An empty mask never occurs, yet expanding it walks the whole window
+            models.CheckConstraint(condition=models.Q(weekdays__range=(1, 0b1111111)), name='recurring_weekdays_range'),
+        ]
+
+    @property
+    def weekday_names(self):
+        if self.weekdays == self.EVERY_DAY:
+            return "Every day"
+        if self.weekdays == self.WEEKDAYS:
+            return "Weekdays"
+        return ", ".join(name for bit, name in enumerate(calendar.day_abbr) if self.weekdays & (1 << bit))
+
+    def __str__(self):
+        until = self.active_until.date() if self.active_until else 'open-ended'
+        return f"{self.parking_space_id} - {self.renter_id} ({self.start_time:%H:%M}-{self.end_time:%H:%M}, {self.active_from.date()} to {until})"
+
+class ArchivedBooking(models.Model):
+    # Cold bookings (finished or closed long ago) moved out of Booking by
+    # marketplace.archive. Keeps the original id, so links stay stable.
+    id = models.BigIntegerField(primary_key=True)
+    parking_space = models.ForeignKey(ParkingSpace, related_name='archived_bookings', on_delete=models.CASCADE)
+    renter = models.ForeignKey(User, related_name='archived_bookings', on_delete=models.CASCADE)
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
+    duration_type = models.CharField(max_length=10, choices=Booking.DURATION_CHOICES)
+    quoted_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Booking history is paged newest-first per renter
+            models.Index(fields=['renter', 'id'], name='archived_booking_renter_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.parking_space_id} - {self.renter_id} ({self.start_datetime.date()} to {self.end_datetime.date()})"
+
+class GeocodeResult(models.Model):
+    # Persistent geocoding cache; a row with no coordinates records a miss
+    query = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def coordinates(self):
+        if self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
+
+    def __str__(self):
+        return self.query
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When the worker may (re)try this message; also acts as a claim lease
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+class DayOccupancy(models.Model):
+    # Quarter-hour occupancy of a space for one local day: 96 characters,
+    # '1' where an approved booking covers the slot. Rows are created on
+    # demand and refreshed whenever a booking touching that day changes.
+    SLOTS_PER_DAY = 96
+
+    parking_space = models.ForeignKey(ParkingSpace, related_name='occupancy', on_delete=models.CASCADE)
+    day = models.DateField()
+    slots = models.CharField(max_length=SLOTS_PER_DAY)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['parking_space', 'day'], name='unique_space_day_occupancy'),
+        ]
+
+    def __str__(self):
+        return f"{self.parking_space_id} {self.day}"
+
+class SpaceDailyStats(models.Model):
+    # Per-space, per-day booking rollup maintained by marketplace.rollups.
+    # Approved time and revenue are split across the days a booking covers;
+    # a pending request counts on its start day.
+    parking_space = models.ForeignKey(ParkingSpace, related_name='daily_stats', on_delete=models.CASCADE)
+    day = models.DateField()
+    approved_minutes = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['parking_space', 'day'], name='unique_space_daily_stats'),
+        ]
+        verbose_name_plural = 'space daily stats'
+
+    def __str__(self):
+        return f"{self.parking_space_id} {self.day}"
+
+    @property
+    def approved_hours(self):
+        return round(self.approved_minutes / 60, 2)
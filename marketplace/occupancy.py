@@ -0,0 +1,209 @@
+"""
+Quarter-hour availability served from a per-day occupancy index.
+
+DayOccupancy rows hold a 96-slot bitmap per space and local day, matching
+the 15-minute grid of CustomDateTimeWidget. Rows are built on first request
+from the occupying bookings (approved, or completed once they have ended)
+and recurring rules of the missing days only.
+After that, any booking or rule save or delete refreshes just the existing
+rows for the days it covers, so answering a request never rescans a
+space's booking history.
+"""
+import math
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Booking, DayOccupancy, ParkingSpace, RecurringBooking
+from .recurrence import rule_intervals
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = DayOccupancy.SLOTS_PER_DAY
+# Statuses whose bookings take up their slots; complete_past turns
+# approved into completed, which must not free a past day
+OCCUPYING = ('approved', 'completed')
+# How far either side of today availability can be asked for
+RANGE_YEARS = 5
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _slot_index(moment, day, round_up=False):
+    local = timezone.localtime(moment)
+    if local.date() < day:
+        return 0
+    if local.date() > day:
+        return SLOTS_PER_DAY
+    seconds = local.hour * 3600 + local.minute * 60 + local.second + local.microsecond / 1e6
+    slot = seconds / (SLOT_MINUTES * 60)
+    return math.ceil(slot) if round_up else math.floor(slot)
+
+
+def _days(first_day, last_day):
+    day = first_day
+    while day <= last_day:
+        yield day
+        day += timedelta(days=1)
+
+
+def _bitmaps_many(days_by_space):
+    """
+    Compute slot bitmaps for ``{space_id: days}`` from occupying bookings
+    and rules, in two queries however many spaces are involved.
+    """
+    windows = {
+        space_id: (_day_start(min(days)), _day_start(max(days) + timedelta(days=1)))
+        for space_id, days in days_by_space.items() if days
+    }
+    if not windows:
+        return {}
+    condition = Q()
+    for space_id, (lo, hi) in windows.items():
+        condition |= Q(parking_space_id=space_id, end_datetime__gt=lo, start_datetime__lt=hi)
+    intervals = rule_intervals(windows)
+    for space_id, start, end in Booking.objects.filter(condition, status__in=OCCUPYING).values_list(
+        'parking_space_id', 'start_datetime', 'end_datetime'
+    ):
+        intervals[space_id].append((start, end))
+    return {space_id: _fill(sorted(days_by_space[space_id]), intervals[space_id]) for space_id in windows}
+
+
+def _bitmaps(space_id, days):
+    return _bitmaps_many({space_id: days}).get(space_id, {})
+
+
+def _fill(days, intervals):
+    wanted = set(days)
+    slots = {day: ['0'] * SLOTS_PER_DAY for day in days}
+    for start, end in intervals:
+        first = max(timezone.localtime(start).date(), days[0])
+        last = min(timezone.localtime(end).date(), days[-1])
+        for day in _days(first, last):
+            if day not in wanted:
+                continue
+            lo = _slot_index(start, day)
+            hi = _slot_index(end, day, round_up=True)
+            for index in range(lo, hi):
+                slots[day][index] = '1'
+    return {day: ''.join(bits) for day, bits in slots.items()}
+
+
+def requested_range(start, days):
+    """
+    Parse the ``start`` (YYYY-MM-DD, default today) and ``days`` (1 to 31)
+    query parameters into ``(first_day, last_day)``. Raises ValueError with
+    a message for the client if they are malformed or out of range.
+    """
+    try:
+        first_day = date.fromisoformat(start) if start is not None else timezone.localdate()
+        days = int(days)
+    except ValueError:
+        raise ValueError("start must be YYYY-MM-DD and days a number.")
+    if not 1 <= days <= 31:
+        raise ValueError("days must be between 1 and 31.")
+    if abs((first_day - timezone.localdate()).days) > RANGE_YEARS * 366:
+        raise ValueError(f"start must be within {RANGE_YEARS} years of today.")
+    return first_day, first_day + timedelta(days=days - 1)
+
+
+def get_occupancy(space_id, first_day, last_day):
+    """Return ``{day: bitmap}`` for the range, building only missing rows."""
+    return get_occupancy_many([space_id], first_day, last_day)[space_id]
+
+
+def _stored(space_ids, first_day, last_day):
+    rows = {space_id: {} for space_id in space_ids}
+    for space_id, day, slots in DayOccupancy.objects.filter(
+        parking_space_id__in=space_ids, day__range=(first_day, last_day)
+    ).values_list('parking_space_id', 'day', 'slots'):
+        rows[space_id][day] = slots
+    return rows
+
+
+def get_occupancy_many(space_ids, first_day, last_day):
+    """
+    Return ``{space_id: {day: bitmap}}`` for the range, building only
+    missing rows. A warm index answers in one query; building runs a fixed
+    number of queries for any number of spaces.
+    """
+    rows = _stored(space_ids, first_day, last_day)
+    span = (last_day - first_day).days + 1
+    incomplete = [space_id for space_id, days in rows.items() if len(days) < span]
+    if incomplete:
+        with transaction.atomic():
+            # Lock the spaces as approvals do, so none can commit between
+            # reading the bookings below and saving the rows built from them
+            list(ParkingSpace.objects.select_for_update().filter(pk__in=incomplete).order_by('pk').values_list('pk'))
+            # Another request may have built some of them while we waited
+            rows.update(_stored(incomplete, first_day, last_day))
+            missing = {
+                space_id: [day for day in _days(first_day, last_day) if day not in rows[space_id]]
+                for space_id in incomplete
+            }
+            # Only build the spans that are actually missing
+            built = _bitmaps_many(missing)
+            DayOccupancy.objects.bulk_create([
+                DayOccupancy(parking_space_id=space_id, day=day, slots=slots)
+                for space_id, bitmaps in built.items() for day, slots in bitmaps.items()
+            ])
+        for space_id, bitmaps in built.items():
+            rows[space_id].update(bitmaps)
+    return {space_id: dict(sorted(days.items())) for space_id, days in rows.items()}
+
+
+def refresh(space_id, start, end=None):
+    """Recompute existing index rows for the days touched by ``[start, end)``; ``end=None`` is open-ended."""
+    rows = DayOccupancy.objects.filter(parking_space_id=space_id, day__gte=timezone.localtime(start).date())
+    if end is not None:
+        rows = rows.filter(day__lte=timezone.localtime(end).date())
+    rows = list(rows)
+    if not rows:
+        return
+    built = _bitmaps(space_id, [row.day for row in rows])
+    for row in rows:
+        row.slots = built[row.day]
+    DayOccupancy.objects.bulk_update(rows, ['slots'])
+
+
+def slot_ranges(bitmap, value):
+    """Turn a bitmap into ``[('HH:MM', 'HH:MM'), ...]`` runs of ``value``."""
+    ranges = []
+    index = 0
+    while index < SLOTS_PER_DAY:
+        if bitmap[index] != value:
+            index += 1
+            continue
+        start = index
+        while index < SLOTS_PER_DAY and bitmap[index] == value:
+            index += 1
+        ranges.append((_format_slot(start), _format_slot(index)))
+    return ranges
+
+
+def _format_slot(index):
+    minutes = index * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@receiver(post_save, sender=Booking, dispatch_uid='occupancy_booking_saved')
+def _booking_saved(sender, instance, **kwargs):
+    refresh(instance.parking_space_id, instance.start_datetime, instance.end_datetime)
+
+
+@receiver(post_delete, sender=Booking, dispatch_uid='occupancy_booking_deleted')
+def _booking_deleted(sender, instance, **kwargs):
+    # Deleting a booking that does not occupy slots changes nothing
+    if instance.status in OCCUPYING:
+        refresh(instance.parking_space_id, instance.start_datetime, instance.end_datetime)
+
+
+@receiver(post_save, sender=RecurringBooking, dispatch_uid='occupancy_rule_saved')
+@receiver(post_delete, sender=RecurringBooking, dispatch_uid='occupancy_rule_deleted')
+def _rule_changed(sender, instance, **kwargs):
+    refresh(instance.parking_space_id, instance.active_from, instance.active_until)
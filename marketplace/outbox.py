@@ -0,0 +1,98 @@
+"""
+Persistent outbound email queue.
+
+Views call ``queue_mail`` instead of ``send_mail``, which only inserts an
+OutboundEmail row. The ``send_queued_mail`` management command drains the
+queue in batches over a single backend connection, retrying failures with
+exponential backoff. Delivery goes through ``EMAIL_BACKEND``, so the console
+or file-based backends make the whole pipeline work offline.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or '',
+        recipients=list(recipient_list),
+    )
+
+
+def _backoff(attempts):
+    base = getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def _claim_batch(batch_size):
+    # Push claimed rows' next_attempt_at past a lease so a concurrent worker
+    # skips them; if this worker dies, they become due again afterwards.
+    lease = timedelta(seconds=getattr(settings, 'OUTBOX_LEASE_SECONDS', 300))
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(next_attempt_at=now + lease)
+    return batch
+
+
+def _fail(email, error, now, max_attempts):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+    else:
+        email.next_attempt_at = now + _backoff(email.attempts)
+
+
+def deliver_batch(batch_size=100):
+    """Send up to ``batch_size`` due emails and return how many were sent."""
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return 0
+
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+    now = timezone.now()
+    sent = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        for email in batch:
+            _fail(email, error, now, max_attempts)
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=email.from_email or None,
+                    to=email.recipients,
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as error:
+                    _fail(email, error, now, max_attempts)
+                else:
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    email.attempts += 1
+                    sent += 1
+        finally:
+            connection.close()
+
+    OutboundEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return sent
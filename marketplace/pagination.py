@@ -0,0 +1,99 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str | None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+PK_ORDER = ('-pk',)
+
+
+def parse_cursor(value):
+    """Return the primary key encoded in a cursor, or None for the first page."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
+
+
+def _field(name):
+    return name.lstrip('-'), name.startswith('-')
+
+
+def _encode(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def _decode(value, length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(value.encode()))
+    except (AttributeError, ValueError, binascii.Error):
+        return None
+    return values if isinstance(values, list) and len(values) == length else None
+
+
+def _after_cursor(queryset, cursor, ordering):
+    queryset = queryset.order_by(*ordering)
+    if ordering == PK_ORDER:
+        cursor = parse_cursor(cursor)
+        return queryset if cursor is None else queryset.filter(pk__lt=cursor)
+
+    values = _decode(cursor, len(ordering)) if cursor else None
+    if values is None:
+        return queryset
+    # Rows after (v1, v2, ...): past v1, or equal to v1 and past v2, and so on
+    after = Q()
+    for i, name in enumerate(ordering):
+        field, descending = _field(name)
+        step = Q(**{f'{field}__{"lt" if descending else "gt"}': values[i]})
+        for earlier, value in zip(ordering[:i], values):
+            step &= Q(**{_field(earlier)[0]: value})
+        after |= step
+    try:
+        return queryset.filter(after)
+    except ValidationError:
+        return queryset
+
+
+def _page(items, page_size, ordering):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        if ordering == PK_ORDER:
+            next_cursor = str(items[-1].pk)
+        else:
+            next_cursor = _encode([getattr(items[-1], _field(name)[0]) for name in ordering])
+    return KeysetPage(items=items, next_cursor=next_cursor)
+
+
+def keyset_page(queryset, cursor=None, page_size=24, ordering=PK_ORDER):
+    """
+    Slice ``queryset`` newest-first by primary key, starting after ``cursor``.
+
+    Every page is a ``pk < cursor`` range scan on the primary key index,
+    so deep pages cost the same as the first one (unlike OFFSET).
+
+    Any other ``ordering`` must end in a unique field; its cursor encodes
+    the last row's value for every field and the next page starts past it.
+    """
+    # Fetch one extra row to learn whether another page exists
+    return _page(list(_after_cursor(queryset, cursor, ordering)[:page_size + 1]), page_size, ordering)
+
+
+async def akeyset_page(queryset, cursor=None, page_size=24, ordering=PK_ORDER):
+    """Async version of ``keyset_page`` for async views."""
+    items = [item async for item in _after_cursor(queryset, cursor, ordering)[:page_size + 1]]
+    return _page(items, page_size, ordering)
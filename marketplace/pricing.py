@@ -0,0 +1,126 @@
+"""
+Price quotes for candidate bookings.
+
+A booking is split into whole years, months, days and hours, largest first,
+and each tier is charged as a number of hours at the space's hourly price
+(``PRICE_TIERS``). A remainder never costs more than one more unit of the
+tier above it, so 20 hours are billed as a day whenever that is cheaper.
+
+Every tier is a multiple of ``price_per_hour``, so the breakdown of a window
+is the same for every space. ``quote_spaces`` works it out once per window
+and scales it by each space's price, which lets a search page quote all its
+cards in one call. Quotes are cached per space and window under the
+listing's fragment cache version, so a price edit invalidates them.
+
+Every Booking stores its quote in ``quoted_price`` when first saved
+(``_snapshot_price``), so the summary page and revenue rollups keep the
+price the renter was shown even after the host changes the rate.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from . import fragment_cache
+from .models import Booking
+
+CENT = Decimal('0.01')
+
+@dataclass(frozen=True)
+class Quote:
+    total: Decimal
+    # ((duration type, units), ...) largest tier first; hours may be fractional
+    breakdown: tuple
+    duration_type: str
+
+
+def _tiers():
+    tiers = settings.PRICE_TIERS
+    return sorted(((name, length * 60, Decimal(price)) for name, length, price in tiers), key=lambda tier: tier[1])
+
+
+def _charge(minutes, tiers):
+    name, length, price = tiers[-1]
+    if len(tiers) == 1:
+        units = Decimal(minutes) / length
+        return units * price, ((name, units),) if minutes else ()
+    units, rest = divmod(minutes, length)
+    rest_cost, rest_breakdown = _charge(rest, tiers[:-1])
+    if rest and rest_cost >= price:
+        # Cheaper to round the remainder up to one more unit of this tier
+        units, rest_cost, rest_breakdown = units + 1, Decimal(0), ()
+    return units * price + rest_cost, ((name, units),) + rest_breakdown if units else rest_breakdown
+
+
+def charged_hours(start, end):
+    """Return ``(hours billed at the hourly rate, breakdown)`` for ``[start, end)``."""
+    minutes = max(0, round((end - start).total_seconds() / 60))
+    return _charge(minutes, _tiers())
+
+
+def _price(price_per_hour, hours, breakdown):
+    return Quote(
+        total=(price_per_hour * hours).quantize(CENT),
+        breakdown=breakdown,
+        duration_type=breakdown[0][0] if breakdown else 'hour',
+    )
+
+
+def _key(space_id, version, start, end):
+    return f'quote:{space_id}:v{version}:{start.timestamp():.0f}:{end.timestamp():.0f}'
+
+
+def quote_spaces(spaces, start, end):
+    """
+    Quote ``[start, end)`` on every space in ``spaces`` (which must have
+    ``price_per_hour`` loaded). Returns ``{space_id: Quote}`` using two cache
+    round trips and no queries.
+    """
+    spaces = list(spaces)
+    if not spaces:
+        return {}
+    cache = fragment_cache.get_cache()
+    versions = fragment_cache.versions([space.pk for space in spaces], cache)
+    keys = {space.pk: _key(space.pk, versions[space.pk], start, end) for space in spaces}
+    cached = cache.get_many(keys.values())
+
+    quotes = {}
+    missing = {}
+    hours, breakdown = None, None
+    for space in spaces:
+        if keys[space.pk] in cached:
+            quotes[space.pk] = cached[keys[space.pk]]
+            continue
+        if hours is None:
+            hours, breakdown = charged_hours(start, end)
+        quotes[space.pk] = missing[keys[space.pk]] = _price(space.price_per_hour, hours, breakdown)
+    if missing:
+        cache.set_many(missing, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600))
+    return quotes
+
+
+def quote(space, start, end):
+    return quote_spaces([space], start, end)[space.pk]
+
+
+def booking_quote(booking):
+    """
+    The quote a booking was made at, from its ``quoted_price`` snapshot.
+    Rows saved without ``pre_save`` (``bulk_create``) have no snapshot and
+    are quoted at the space's current price.
+    """
+    hours, breakdown = charged_hours(booking.start_datetime, booking.end_datetime)
+    if booking.quoted_price is None:
+        return _price(booking.parking_space.price_per_hour, hours, breakdown)
+    return Quote(
+        total=booking.quoted_price, breakdown=breakdown, duration_type=breakdown[0][0] if breakdown else 'hour',
+    )
+
+
+@receiver(pre_save, sender=Booking, dispatch_uid='pricing_snapshot_price')
+def _snapshot_price(sender, instance, **kwargs):
+    if instance.quoted_price is None:
+        hours, _ = charged_hours(instance.start_datetime, instance.end_datetime)
+        instance.quoted_price = (instance.parking_space.price_per_hour * hours).quantize(CENT)
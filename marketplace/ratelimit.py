@@ -0,0 +1,130 @@
+"""
+Token-bucket rate limiting for the authentication endpoints.
+
+Each scope in ``RATE_LIMITS`` gives a bucket per client IP and per account
+as ``(capacity, seconds)``: a bucket holds up to ``capacity`` attempts and
+refills completely over ``seconds``. The ``rate_limited`` decorator spends
+one token from each bucket before the view runs, so a rejected POST never
+reaches password hashing or the outbox.
+
+``RATE_LIMIT_BACKEND`` selects where buckets live: ``"local"`` keeps them
+in process memory, ``"cache"`` keeps them in ``RATE_LIMIT_CACHE_ALIAS`` so
+every worker shares them. The cache backend does a plain read-modify-write;
+two simultaneous requests may both get the last token, which is harmless
+for throttling.
+"""
+import hashlib
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+
+def _refill(state, capacity, seconds, now):
+    tokens, stamp = state or (capacity, now)
+    return min(capacity, tokens + max(0, now - stamp) * capacity / seconds)
+
+
+def _wait(tokens, capacity, seconds):
+    return (1 - tokens) * seconds / capacity
+
+
+class LocalBuckets:
+    max_entries = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, seconds):
+        """Spend a token; return 0 if allowed, else seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            tokens = _refill(self._buckets.get(key), capacity, seconds, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return _wait(tokens, capacity, seconds)
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_entries:
+                self._prune(now, seconds)
+            return 0
+
+    def _prune(self, now, seconds):
+        # Buckets idle for a full refill period are full again; dropping them changes nothing
+        for key in [key for key, (_, stamp) in self._buckets.items() if now - stamp >= seconds]:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, seconds):
+        now = time.time()
+        tokens = _refill(self.cache.get(key), capacity, seconds, now)
+        if tokens < 1:
+            self.cache.set(key, (tokens, now), timeout=math.ceil(seconds))
+            return _wait(tokens, capacity, seconds)
+        # An untouched bucket refills within ``seconds``, so expiring it then is exact
+        self.cache.set(key, (tokens - 1, now), timeout=math.ceil(seconds))
+        return 0
+
+    def clear(self):
+        self.cache.clear()
+
+
+local_buckets = LocalBuckets()
+
+
+def get_backend():
+    if getattr(settings, 'RATE_LIMIT_BACKEND', 'cache') == 'local':
+        return local_buckets
+    return CacheBuckets(getattr(settings, 'RATE_LIMIT_CACHE_ALIAS', 'default'))
+
+
+def client_ip(request):
+    # Behind a proxy, have it set REMOTE_ADDR to the real client address
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def post_field(name):
+    def identity(request):
+        return request.POST.get(name, '').strip().lower()
+    return identity
+
+
+def check(scope, request, account=None):
+    """Spend one token from each of ``scope``'s buckets; return the longest wait, or 0."""
+    limits = getattr(settings, 'RATE_LIMITS', {}).get(scope, {})
+    backend = get_backend()
+    wait = 0
+    for kind, identity in (('ip', client_ip(request)), ('account', account)):
+        if identity and kind in limits:
+            digest = hashlib.sha1(identity.encode()).hexdigest()
+            wait = max(wait, backend.take(f'ratelimit:{scope}:{kind}:{digest}', *limits[kind]))
+    return wait
+
+
+def rate_limited(scope, account=None):
+    """Throttle POSTs to a view; ``account`` maps the request to an account identity."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method == 'POST':
+                wait = check(scope, request, account(request) if account else None)
+                if wait:
+                    retry_after = math.ceil(wait)
+                    response = render(request, 'registration/rate_limited.html', {'retry_after': retry_after}, status=429)
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
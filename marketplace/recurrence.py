@@ -0,0 +1,105 @@
+"""
+Lazy expansion of RecurringBooking rules.
+
+A rule is never materialized: ``occurrences`` walks only the local days of
+the window being checked (plus the day before, for overnight slots), so a
+conflict check against an open-ended reservation costs O(window) however
+long the rule has been running.
+"""
+from datetime import date, datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import RecurringBooking
+
+# Rules repeat weekly, so two weeks past the start of an overlap, plus the
+# clipped first day, contains every combination the overlap can produce.
+_PERIOD_DAYS = 15
+
+
+def duration(rule):
+    length = datetime.combine(date.min, rule.end_time) - datetime.combine(date.min, rule.start_time)
+    if length <= timedelta(0):
+        length += timedelta(days=1)
+    return length
+
+
+def occurrences(rule, start, end):
+    """Yield ``(start, end)`` of every occurrence of ``rule`` that overlaps ``[start, end)``."""
+    lo = max(start, rule.active_from)
+    hi = min(end, rule.active_until) if rule.active_until else end
+    if lo >= hi:
+        return
+    length = duration(rule)
+    day = timezone.localtime(lo).date() - timedelta(days=1)
+    last_day = timezone.localtime(hi).date()
+    while day <= last_day:
+        if rule.weekdays & (1 << day.weekday()):
+            occurrence_start = timezone.make_aware(datetime.combine(day, rule.start_time))
+            occurrence_end = occurrence_start + length
+            # Clip to the rule's own active period
+            occurrence_start = max(occurrence_start, rule.active_from)
+            if rule.active_until:
+                occurrence_end = min(occurrence_end, rule.active_until)
+            if occurrence_start < hi and occurrence_end > lo:
+                yield occurrence_start, occurrence_end
+        day += timedelta(days=1)
+
+
+def overlaps(rule, start, end):
+    return next(occurrences(rule, start, end), None) is not None
+
+
+def conflicting_rules(space, start, end):
+    """Approved rules on ``space`` with an occurrence inside ``[start, end)``."""
+    rules = RecurringBooking.objects.approved_active(start, end).filter(parking_space=space)
+    return [rule for rule in rules if overlaps(rule, start, end)]
+
+
+def blocked_space_ids(start, end, spaces=None):
+    """
+    Ids of the spaces an approved rule occupies somewhere in ``[start, end)``,
+    out of ``spaces`` (a queryset or ids; every space if None).
+    """
+    rules = RecurringBooking.objects.approved_active(start, end)
+    if spaces is not None:
+        rules = rules.filter(parking_space__in=spaces)
+    return {rule.parking_space_id for rule in rules if overlaps(rule, start, end)}
+
+
+def rule_intervals(space_spans):
+    """
+    Return ``{space_id: [(start, end), ...]}`` for approved rule occurrences
+    inside each ``{space_id: (start, end)}`` span, in one query.
+    """
+    condition = Q()
+    for space_id, (lo, hi) in space_spans.items():
+        condition |= Q(parking_space_id=space_id, active_from__lt=hi) & (
+            Q(active_until__isnull=True) | Q(active_until__gt=lo)
+        )
+    intervals = {space_id: [] for space_id in space_spans}
+    if space_spans:
+        for rule in RecurringBooking.objects.filter(condition, status='approved'):
+            intervals[rule.parking_space_id].extend(occurrences(rule, *space_spans[rule.parking_space_id]))
+    return intervals
+
+
+def rules_collide(rule, other):
+    """Whether two rules ever occupy the same time."""
+    lo = max(rule.active_from, other.active_from)
+    ends = [until for until in (rule.active_until, other.active_until) if until]
+    hi = min(ends) if ends else None
+    if hi is not None and lo >= hi:
+        return False
+
+    # The pattern is weekly, so the first and last fortnight of the overlap suffice
+    windows = [(lo, lo + timedelta(days=_PERIOD_DAYS))]
+    if hi is not None:
+        windows = [(lo, min(hi, lo + timedelta(days=_PERIOD_DAYS))), (max(lo, hi - timedelta(days=_PERIOD_DAYS)), hi)]
+    for window_start, window_end in windows:
+        theirs = list(occurrences(other, window_start, window_end))
+        for start, end in occurrences(rule, window_start, window_end):
+            if any(start < other_end and end > other_start for other_start, other_end in theirs):
+                return True
+    return False
@@ -0,0 +1,118 @@
+"""
+Incrementally maintained per-space daily booking rollups.
+
+Every status transition adds the booking's contribution under its new
+status and removes the one under its old status (see ``record``). Readers
+then aggregate SpaceDailyStats over a range of days rather than scanning
+bookings. Callers must hold the ParkingSpace row lock, as the functions in
+marketplace.bookings do, so two writers never read-modify-write the same
+rows. ``manage.py rebuild_rollups`` recomputes everything from scratch.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ParkingSpace, SpaceDailyStats
+from .pricing import charged_hours
+
+CENT = Decimal('0.01')
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def contributions(booking, status, price):
+    """
+    Return ``{day: [approved_minutes, pending_count, revenue]}`` for one
+    booking. Completed bookings keep counting as approved time and revenue,
+    which is the booking's quoted price spread over its days by time.
+    ``price`` (per hour) only prices bookings saved without a quote.
+    """
+    if status == 'pending':
+        return {timezone.localtime(booking.start_datetime).date(): [0, 1, Decimal(0)]}
+    if status not in ('approved', 'completed'):
+        return {}
+
+    result = {}
+    total_seconds = Decimal((booking.end_datetime - booking.start_datetime).total_seconds())
+    total = booking.quoted_price
+    if total is None:
+        total = price * charged_hours(booking.start_datetime, booking.end_datetime)[0]
+    day = timezone.localtime(booking.start_datetime).date()
+    last_day = timezone.localtime(booking.end_datetime).date()
+    while day <= last_day:
+        day_start, day_end = _day_bounds(day)
+        seconds = (min(booking.end_datetime, day_end) - max(booking.start_datetime, day_start)).total_seconds()
+        if seconds > 0:
+            minutes = round(seconds / 60)
+            result[day] = [minutes, 0, (total * Decimal(seconds) / total_seconds).quantize(CENT)]
+        day += timedelta(days=1)
+    return result
+
+
+def record(changes):
+    """
+    Apply ``[(booking, old_status, new_status), ...]`` to the rollup table.
+
+    ``old_status`` is None for a newly created booking. Runs a constant
+    number of queries however many bookings or days are involved.
+    """
+    changes = [change for change in changes if change[1] != change[2]]
+    if not changes:
+        return
+
+    # Live prices are only needed for bookings saved without a quote
+    unquoted = {booking.parking_space_id for booking, _, _ in changes if booking.quoted_price is None}
+    prices = dict(ParkingSpace.objects.filter(pk__in=unquoted).values_list('pk', 'price_per_hour')) if unquoted else {}
+    deltas = defaultdict(lambda: [0, 0, Decimal(0)])
+    for booking, old_status, new_status in changes:
+        price = prices.get(booking.parking_space_id)
+        for sign, status in ((-1, old_status), (1, new_status)):
+            for day, values in contributions(booking, status, price).items():
+                delta = deltas[(booking.parking_space_id, day)]
+                for index, value in enumerate(values):
+                    delta[index] += sign * value
+    if not deltas:
+        return
+
+    days = [day for _, day in deltas]
+    existing = {
+        (row.parking_space_id, row.day): row
+        for row in SpaceDailyStats.objects.filter(
+            parking_space_id__in={space_id for space_id, _ in deltas},
+            day__range=(min(days), max(days)),
+        )
+        if (row.parking_space_id, row.day) in deltas
+    }
+
+    to_update, to_create = [], []
+    for key, (minutes, pending, revenue) in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            row = SpaceDailyStats(parking_space_id=key[0], day=key[1])
+            to_create.append(row)
+        else:
+            to_update.append(row)
+        row.approved_minutes += minutes
+        row.pending_count += pending
+        row.revenue += revenue
+
+    SpaceDailyStats.objects.bulk_update(to_update, ['approved_minutes', 'pending_count', 'revenue'], batch_size=500)
+    SpaceDailyStats.objects.bulk_create(to_create, batch_size=500)
+
+
+def summary(spaces, first_day, last_day):
+    """Total approved hours, pending requests and revenue over a day range."""
+    totals = SpaceDailyStats.objects.filter(parking_space__in=spaces, day__range=(first_day, last_day)).aggregate(
+        minutes=Sum('approved_minutes'), pending=Sum('pending_count'), revenue=Sum('revenue'),
+    )
+    return {
+        'approved_hours': round((totals['minutes'] or 0) / 60, 2),
+        'pending_count': totals['pending'] or 0,
+        'revenue': totals['revenue'] or Decimal(0),
+    }
@@ -0,0 +1,54 @@
+"""
+Route reads from read-only pages to a replica.
+
+Views wrapped in ``read_from_replica`` run their queries against the alias
+named by ``REPLICA_DATABASE``; everything else, and every write, goes to
+``default``. The flag is a context variable, so it follows a request into
+async views and the threads the async ORM runs queries on. Replicas lag
+behind the primary, so only pages that tolerate slightly stale data use it.
+"""
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def read_from_replica(view):
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            token = _use_replica.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+    else:
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            token = _use_replica.set(True)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+    return inner
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return getattr(settings, 'REPLICA_DATABASE', None)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication
+        return db != getattr(settings, 'REPLICA_DATABASE', None)
@@ -0,0 +1,141 @@
+"""
+Listing search: full-text matching, price range and availability window.
+
+On SQLite, text matching goes through an FTS5 shadow table keyed by the
+ParkingSpace id and kept in sync by the signal handlers below. PostgreSQL
+matches ``search_vector()`` against a prefix tsquery, served by the GIN
+expression index from migration 0019. Other databases fall back to
+``icontains`` lookups.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Booking, ParkingSpace
+from .recurrence import blocked_space_ids
+
+FTS_TABLE = 'marketplace_parkingspace_fts'
+FTS_COLUMNS = ('title', 'description', 'location')
+
+# Unstemmed, like the FTS5 table; must match the indexed expression
+SEARCH_CONFIG = 'simple'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def index_space(space, conn=None):
+    conn = conn or connection
+    if not fts_enabled(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [space.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s)",
+            [space.pk, space.title, space.description, space.location],
+        )
+
+
+def unindex_space(pk, conn=None):
+    conn = conn or connection
+    if not fts_enabled(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+@receiver(post_save, sender=ParkingSpace, dispatch_uid='search_index_space')
+def _index_on_save(sender, instance, **kwargs):
+    index_space(instance)
+
+
+@receiver(post_delete, sender=ParkingSpace, dispatch_uid='search_unindex_space')
+def _unindex_on_delete(sender, instance, **kwargs):
+    unindex_space(instance.pk)
+
+
+def _fts_query(text):
+    # Quote every token so user input can't inject FTS operators, and
+    # prefix-match the last one so partial words still find results.
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_vector():
+    return SearchVector(*FTS_COLUMNS, config=SEARCH_CONFIG)
+
+
+def _tsquery(text):
+    # Same rules as _fts_query: every token quoted, the last one a prefix
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    terms = [f"'{token}'" for token in tokens]
+    terms[-1] += ':*'
+    return ' & '.join(terms)
+
+
+def filter_text(queryset, text):
+    if not text or not text.strip():
+        return queryset
+
+    if fts_enabled():
+        match = _fts_query(text)
+        if match is None:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+        ))
+
+    if connection.vendor == 'postgresql':
+        match = _tsquery(text)
+        if match is None:
+            return queryset
+        return queryset.alias(search=search_vector()).filter(
+            search=SearchQuery(match, config=SEARCH_CONFIG, search_type='raw'),
+        )
+
+    condition = Q()
+    for token in _TOKEN_RE.findall(text):
+        condition &= (
+            Q(title__icontains=token)
+            | Q(description__icontains=token)
+            | Q(location__icontains=token)
+        )
+    return queryset.filter(condition)
+
+
+def filter_price(queryset, min_price=None, max_price=None):
+    if min_price is not None:
+        queryset = queryset.filter(price_per_hour__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price_per_hour__lte=max_price)
+    return queryset
+
+
+def filter_available(queryset, start=None, end=None):
+    if not start or not end:
+        return queryset
+    overlapping = Booking.objects.approved_overlapping(OuterRef('pk'), start, end)
+    # Recurring rules cannot be expanded in SQL; expand the active ones over the window here
+    return queryset.filter(~Exists(overlapping)).exclude(
+        pk__in=blocked_space_ids(start, end, spaces=queryset.values('pk'))
+    )
+
+
+def search_spaces(queryset, q=None, min_price=None, max_price=None, start=None, end=None):
+    queryset = filter_text(queryset, q)
+    queryset = filter_price(queryset, min_price, max_price)
+    return filter_available(queryset, start, end)
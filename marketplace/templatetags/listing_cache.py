@@ -0,0 +1,62 @@
+from django import template
+
+from marketplace.fragment_cache import prime, render_cached
+
+register = template.Library()
+
+
+def _primed_key(name):
+    return ('listingcache', name)
+
+
+class ListingFragmentNode(template.Node):
+    def __init__(self, nodelist, name, space):
+        self.nodelist = nodelist
+        self.name = name
+        self.space = space
+
+    def render(self, context):
+        space = self.space.resolve(context)
+        primed = context.render_context.get(_primed_key(self.name))
+        return render_cached(self.name, space.pk, lambda: self.nodelist.render(context), primed)
+
+
+class PrimeListingCacheNode(template.Node):
+    def __init__(self, name, spaces):
+        self.name = name
+        self.spaces = spaces
+
+    def render(self, context):
+        spaces = self.spaces.resolve(context) or ()
+        context.render_context[_primed_key(self.name)] = prime(self.name, [space.pk for space in spaces])
+        return ''
+
+
+@register.tag
+def listingcache(parser, token):
+    """
+    Cache the enclosed fragment per listing until the listing changes::
+
+        {% listingcache "card" space %}...{% endlistingcache %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and a listing")
+    name = bits[1].strip('"\'')
+    nodelist = parser.parse(('endlistingcache',))
+    parser.delete_first_token()
+    return ListingFragmentNode(nodelist, name, parser.compile_filter(bits[2]))
+
+
+@register.tag
+def primelistingcache(parser, token):
+    """
+    Look up a whole page of ``listingcache`` fragments in one go, before the
+    loop that renders them::
+
+        {% primelistingcache "card" spaces %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and a list of listings")
+    return PrimeListingCacheNode(bits[1].strip('"\''), parser.compile_filter(bits[2]))
@@ -0,0 +1,66 @@
+"""
+Streaming upload handler with size limits and content hashing.
+
+Installed through ``FILE_UPLOAD_HANDLERS``. Every uploaded file is spooled
+to a temporary file chunk by chunk, so memory use stays at one chunk no
+matter how many or how large the files are. ``MAX_UPLOAD_FILE_SIZE`` and
+``MAX_UPLOAD_REQUEST_SIZE`` are enforced while reading; oversized files
+are dropped and the reason is left in ``request.upload_errors`` for the
+form to report. Each stored file gets a ``content_hash`` (SHA-256) used to
+deduplicate identical images.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, StopUpload, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+
+def upload_errors(request):
+    return getattr(request, 'upload_errors', [])
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_file_size = getattr(settings, 'MAX_UPLOAD_FILE_SIZE', 10 * 2**20)
+        self.max_request_size = getattr(settings, 'MAX_UPLOAD_REQUEST_SIZE', 60 * 2**20)
+        self.request_too_large = False
+        self.received = 0
+
+    def _error(self, message):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_errors'):
+                self.request.upload_errors = []
+            self.request.upload_errors.append(message)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > self.max_request_size:
+            # Reject up front: every file is skipped without touching disk
+            self.request_too_large = True
+            self._error(f"Uploads are limited to {filesizeformat(self.max_request_size)} per request.")
+        return super().handle_raw_input(input_data, META, content_length, boundary, encoding)
+
+    def new_file(self, *args, **kwargs):
+        if self.request_too_large:
+            raise SkipFile
+        super().new_file(*args, **kwargs)
+        self.file_received = 0
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file_received += len(raw_data)
+        self.received += len(raw_data)
+        if self.received > self.max_request_size:
+            self._error(f"Uploads are limited to {filesizeformat(self.max_request_size)} per request.")
+            raise StopUpload
+        if self.file_received > self.max_file_size:
+            self._error(f"{self.file_name} is larger than {filesizeformat(self.max_file_size)}.")
+            raise SkipFile
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.content_hash = self.sha256.hexdigest()
+        return uploaded
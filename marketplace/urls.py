@@ -1,10 +1,13 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('feed/', views.home_feed, name='home_feed'),
+    path('nearby/', views.nearby_spaces, name='nearby_spaces'),
     path('add/', views.add_parking_space, name='add_parking_space'),
     path('parking/<int:pk>/', views.parking_detail, name='parking_detail'),
+    path('parking/<int:pk>/availability/', views.parking_availability, name='parking_availability'),
     path('parking/<int:pk>/book/', views.book_parking_space, name='book_parking_space'),
     path('booking/<int:booking_id>/summary/', views.booking_summary, name='booking_summary'),
     
@@ -15,10 +18,26 @@ urlpatterns = [
     path('host/listings/<int:pk>/delete/', views.delete_parking_space, name='delete_parking_space'),
     path('host/bookings/<int:booking_id>/approve/', views.approve_booking, name='approve_booking'),
     path('host/bookings/<int:booking_id>/decline/', views.decline_booking, name='decline_booking'),
+    path('host/bookings/bulk/', views.bulk_booking_action, name='bulk_booking_action'),
+    path('host/recurring/<int:rule_id>/approve/', views.approve_recurring_booking, name='approve_recurring_booking'),
+    path('host/recurring/<int:rule_id>/decline/', views.decline_recurring_booking, name='decline_recurring_booking'),
     
+    # Operations
+    path('stats/cache/', views.cache_stats, name='cache_stats'),
+    path('metrics/', views.metrics_view, name='metrics'),
+
+    # JSON API, see marketplace.api
+    path('api/v1/spaces/', api.spaces, name='api_spaces'),
+    path('api/v1/spaces/<int:pk>/', api.space_detail, name='api_space_detail'),
+    path('api/v1/images/', api.images, name='api_images'),
+    path('api/v1/availability/', api.availability, name='api_availability'),
+    path('api/v1/bookings/', api.bookings, name='api_bookings'),
+    path('api/v1/bookings/recurring/', api.recurring_bookings, name='api_recurring_bookings'),
+
     # Renter routes
     path('my-bookings/', views.my_bookings, name='my_bookings'),
     path('my-bookings/<int:booking_id>/cancel/', views.cancel_booking, name='cancel_booking'),
+    path('my-bookings/recurring/<int:rule_id>/cancel/', views.cancel_recurring_booking, name='cancel_recurring_booking'),
 
     # Authentication routes
     path("signup/", views.signup, name="signup"),
@@ -1,25 +1,44 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout, login
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
-from .models import ParkingSpace, ParkingImage, Booking
-from .forms import ParkingSpaceForm, ParkingSpaceImageForm, BookingForm, CustomUserCreationForm
+from .models import ArchivedBooking, ParkingSpace, ParkingImage, Booking, RecurringBooking, cover_images_prefetch
+from .forms import ParkingSpaceForm, ParkingSpaceImageForm, BookingForm, CustomUserCreationForm, SearchForm
+from .bookings import (
+    BookingActionError, approve, approve_rule, bulk_transition, cancel, cancel_rule, decline, decline_rule, request_booking,
+)
+from . import challenges, fragment_cache, freshness, metrics, occupancy, rollups
+from .geo import nearest_spaces, spaces_within
+from .images import store_upload
+from .outbox import queue_mail
+from .pagination import akeyset_page, keyset_page
+from .pricing import booking_quote, quote, quote_spaces
+from .ratelimit import post_field, rate_limited
+from .routers import read_from_replica
+from .search import search_spaces
+from .uploads import upload_errors
 from django.conf import settings
-from django.core.mail import send_mail
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import AuthenticationForm
-import random
+from decimal import Decimal
+from datetime import timedelta
 
 def custom_logout(request):
     logout(request)
     return redirect('home')
 
+@rate_limited('signup', account=post_field('email'))
 def signup(request):
     if request.method == "POST":
         form = CustomUserCreationForm(request.POST)
@@ -33,7 +52,7 @@ def signup(request):
                 reverse("verify_email", kwargs={"uidb64": uid, "token": token})
             )
 
-            send_mail(
+            queue_mail(
                 subject="Verify your CityParkr email",
                 message=f"Hi {user.username},\n\nVerify your email by clicking:\n{verify_url}\n\nIf you did not create this account, ignore this email.",
                 from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
@@ -64,6 +83,7 @@ def verify_email(request, uidb64, token):
     messages.error(request, "Verification link is invalid or expired.")
     return redirect("signup")
 
+@rate_limited('login', account=post_field('username'))
 def login_step_one(request):
     if request.method == "POST":
         form = AuthenticationForm(request, data=request.POST)
@@ -74,12 +94,10 @@ def login_step_one(request):
                 messages.error(request, "You must verify your email before logging in.")
                 return redirect("login")
 
-            code = "".join([str(random.randint(0, 9)) for _ in range(6)])
+            challenge_id, code = challenges.issue(user)
+            request.session["pending_2fa_challenge"] = challenge_id
 
-            request.session["pending_2fa_user_id"] = user.id
-            request.session["pending_2fa_code"] = code
-
-            send_mail(
+            queue_mail(
                 subject="Your CityParkr login code",
                 message=f"Your login code is: {code}\n\nIf you did not try to log in, please change your password.",
                 from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
@@ -92,25 +110,29 @@ def login_step_one(request):
 
     return render(request, "registration/login.html", {"form": form})
 
+@rate_limited('login_code', account=lambda request: request.session.get('pending_2fa_challenge'))
 def login_step_two(request):
-    if "pending_2fa_user_id" not in request.session:
+    challenge_id = request.session.get("pending_2fa_challenge")
+    if not challenges.is_active(challenge_id):
+        request.session.pop("pending_2fa_challenge", None)
         return redirect("login")
 
     if request.method == "POST":
-        entered = request.POST.get("code", "").strip()
-        real = request.session.get("pending_2fa_code")
+        user_id = challenges.verify(challenge_id, request.POST.get("code", "").strip())
 
-        if entered == real:
-            user_id = request.session["pending_2fa_user_id"]
+        if user_id is not None:
             user = User.objects.get(id=user_id)
-
-            request.session.pop("pending_2fa_user_id", None)
-            request.session.pop("pending_2fa_code", None)
+            request.session.pop("pending_2fa_challenge", None)
 
             login(request, user)
             messages.success(request, "Logged in successfully.")
             return redirect("home")
 
+        if not challenges.is_active(challenge_id):
+            request.session.pop("pending_2fa_challenge", None)
+            messages.error(request, "Too many attempts or the code expired. Please log in again.")
+            return redirect("login")
+
         messages.error(request, "Invalid code. Please try again.")
 
     return render(request, "registration/two_factor.html")
@@ -122,19 +144,132 @@ def verification_sent(request):
 def hello_parking(request):
     return HttpResponse("Hello Parking World!")
 
-def home(request):
+def _home_spaces(search_form):
     # Only show available spaces
     spaces = ParkingSpace.objects.filter(is_available=True)
-    return render(request, 'marketplace/home.html', {'spaces': spaces})
+    if search_form.is_valid():
+        spaces = search_spaces(spaces, **search_form.cleaned_data)
+    return spaces.for_cards()
+
+def _quote_cards(spaces, search_form):
+    # Cards show a total when the search names a window, all quoted in one call
+    window = search_form.cleaned_data if search_form.is_valid() else {}
+    if window.get('start') and window.get('end'):
+        quotes = quote_spaces(spaces, window['start'], window['end'])
+        for space in spaces:
+            space.quote = quotes[space.pk]
+    return spaces
+
+def _home_page_size():
+    return getattr(settings, "HOME_PAGE_SIZE", 24)
+
+# The read-heavy pages below are async: their queries go through the async
+# ORM, and templates, which may touch lazy relations or request.user, render
+# off the event loop via sync_to_async.
+
+@read_from_replica
+@freshness.acondition(etag_func=freshness.home_etag)
+async def home(request):
+    search_form = SearchForm(request.GET)
+    # Filtering on availability expands recurring rules in Python, so it runs in a thread
+    spaces = await sync_to_async(_home_spaces)(search_form)
+    page = await akeyset_page(spaces, request.GET.get('cursor'), _home_page_size())
+
+    filter_query = request.GET.copy()
+    filter_query.pop('cursor', None)
+    return await sync_to_async(render)(request, 'marketplace/home.html', {
+        'spaces': await sync_to_async(_quote_cards)(page.items, search_form),
+        'page': page,
+        'search_form': search_form,
+        'filter_query': filter_query.urlencode(),
+    })
 
-def parking_detail(request, pk):
-    space = get_object_or_404(ParkingSpace, pk=pk)
+@read_from_replica
+def home_feed(request):
+    # JSON fragment for infinite scroll: rendered cards plus the next cursor
+    search_form = SearchForm(request.GET)
+    page = keyset_page(_home_spaces(search_form), request.GET.get('cursor'), _home_page_size())
+    spaces = _quote_cards(page.items, search_form)
+    html = render_to_string('marketplace/_space_cards.html', {'spaces': spaces}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
+@read_from_replica
+def nearby_spaces(request):
+    # "Parking near me": ?lat=..&lng=..[&radius=km][&limit=n]
+    try:
+        lat = float(request.GET['lat'])
+        lng = float(request.GET['lng'])
+        radius = min(float(request.GET.get('radius', 5)), 50.0)
+        limit = min(int(request.GET.get('limit', 20)), 100)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'lat and lng are required numbers.'}, status=400)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0 or limit <= 0:
+        return JsonResponse({'error': 'Coordinates or radius out of range.'}, status=400)
+
+    spaces = ParkingSpace.objects.filter(is_available=True)
+    if 'radius' in request.GET:
+        results = spaces_within(spaces, lat, lng, radius)[:limit]
+    else:
+        results = nearest_spaces(spaces, lat, lng, limit=limit)
+
+    return JsonResponse({'results': [
+        {
+            'id': space.pk,
+            'title': space.title,
+            'location': space.location,
+            'price_per_hour': str(space.price_per_hour),
+            'latitude': space.latitude,
+            'longitude': space.longitude,
+            'distance_km': round(distance, 3),
+            'url': reverse('parking_detail', args=[space.pk]),
+        }
+        for space, distance in results
+    ]})
+
+@staff_member_required
+def cache_stats(request):
+    return JsonResponse({'fragments': fragment_cache.stats()})
+
+def metrics_view(request):
+    allowed = getattr(settings, "METRICS_ALLOWED_IPS", [])
+    if request.META.get('REMOTE_ADDR') not in allowed and not request.user.is_staff:
+        raise Http404
+    body = metrics.render_prometheus(fragment_cache.stats())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@read_from_replica
+@freshness.acondition(etag_func=freshness.parking_detail_etag, last_modified_func=freshness.parking_detail_last_modified)
+async def parking_detail(request, pk):
+    space = await aget_object_or_404(ParkingSpace.objects.select_related('owner'), pk=pk)
     booking_form = BookingForm()
-    return render(request, 'marketplace/parking_detail.html', {
+    return await sync_to_async(render)(request, 'marketplace/parking_detail.html', {
         'space': space,
         'booking_form': booking_form
     })
 
+def parking_availability(request, pk):
+    # Free/busy quarter-hour slots: ?start=YYYY-MM-DD&days=N (max 31)
+    space = get_object_or_404(ParkingSpace, pk=pk)
+    try:
+        first_day, last_day = occupancy.requested_range(request.GET.get('start'), request.GET.get('days', 7))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    bitmaps = occupancy.get_occupancy(space.pk, first_day, last_day)
+    return JsonResponse({
+        'parking_space': space.pk,
+        'slot_minutes': occupancy.SLOT_MINUTES,
+        'days': [
+            {
+                'date': day.isoformat(),
+                'slots': slots,
+                'busy': occupancy.slot_ranges(slots, '1'),
+                'free': occupancy.slot_ranges(slots, '0'),
+            }
+            for day, slots in bitmaps.items()
+        ],
+    })
+
 @login_required
 def book_parking_space(request, pk):
     space = get_object_or_404(ParkingSpace, pk=pk)
@@ -144,8 +279,8 @@ def book_parking_space(request, pk):
             booking = form.save(commit=False)
             booking.renter = request.user
             booking.parking_space = space
-            booking.status = 'pending'
-            booking.save()
+            booking.duration_type = quote(space, booking.start_datetime, booking.end_datetime).duration_type
+            request_booking(booking)
             # Redirect to summary page instead of detail page
             return redirect('booking_summary', booking_id=booking.pk)
         else:
@@ -158,23 +293,28 @@ def book_parking_space(request, pk):
     return redirect('parking_detail', pk=pk)
 
 @login_required
-def booking_summary(request, booking_id):
-    booking = get_object_or_404(Booking, pk=booking_id, renter=request.user)
-    return render(request, 'marketplace/booking_summary.html', {'booking': booking})
+async def booking_summary(request, booking_id):
+    booking = await aget_object_or_404(
+        Booking.objects.select_related('parking_space').prefetch_related(cover_images_prefetch('parking_space__images')),
+        pk=booking_id, renter=await request.auser(),
+    )
+    return await sync_to_async(render)(request, 'marketplace/booking_summary.html', {
+        'booking': booking, 'quote': booking_quote(booking),
+    })
 
 @login_required
 def add_parking_space(request):
     if request.method == 'POST':
         form = ParkingSpaceForm(request.POST)
-        image_form = ParkingSpaceImageForm(request.POST, request.FILES)
+        image_form = ParkingSpaceImageForm(request.POST, request.FILES, upload_errors=upload_errors(request))
 
         if form.is_valid() and image_form.is_valid():
             parking_space = form.save(commit=False)
             parking_space.owner = request.user
             parking_space.save()
 
-            for image in request.FILES.getlist('images'):
-                ParkingImage.objects.create(parking_space=parking_space, image=image)
+            for image in image_form.cleaned_data['images']:
+                store_upload(parking_space, image)
 
             return redirect('home')
     else:
@@ -208,13 +348,68 @@ def toggle_archive_listing(request, pk):
         messages.success(request, f"Listing is now {status}.")
     return redirect('host_bookings')
 
+def _hours(duration):
+    return Decimal(duration.total_seconds()) / 3600 if duration else Decimal(0)
+
 @login_required
 def host_bookings(request):
-    # Get bookings for spaces owned by the current user
-    bookings = Booking.objects.filter(parking_space__owner=request.user).order_by('status', '-created_at')
-    # Also get the user's listings to manage them
-    my_listings = ParkingSpace.objects.filter(owner=request.user)
-    return render(request, 'marketplace/host_bookings.html', {'bookings': bookings, 'my_listings': my_listings})
+    now = timezone.now()
+    window_days = getattr(settings, "HOST_OCCUPANCY_DAYS", 7)
+    window_end = now + timedelta(days=window_days)
+
+    # Per-listing counts, occupancy and revenue come from one aggregate query
+    my_listings = list(
+        ParkingSpace.objects.filter(owner=request.user)
+        .with_booking_stats(now, window_end)
+        .for_cards()
+        .order_by('-pk')
+    )
+    totals = {'pending': 0, 'approved': 0, 'projected_revenue': Decimal(0)}
+    for space in my_listings:
+        space.occupancy_percent = round(_hours(space.window_booked_time) * 100 / (window_days * 24))
+        space.projected_revenue = (_hours(space.remaining_booked_time) * space.price_per_hour).quantize(Decimal('0.01'))
+        totals['pending'] += space.pending_count
+        totals['approved'] += space.approved_count
+        totals['projected_revenue'] += space.projected_revenue
+
+    # Open recurring bookings are listed separately and count towards the totals
+    rules = list(
+        RecurringBooking.objects.filter(parking_space__owner=request.user, status__in=('pending', 'approved'))
+        .select_related('parking_space', 'renter')
+        .order_by('-pk')
+    )
+    for rule in rules:
+        totals[rule.status] += 1
+
+    # Trailing earnings come from the daily rollups, not from scanning bookings
+    revenue_days = getattr(settings, "HOST_REVENUE_DAYS", 30)
+    today = timezone.localdate()
+    recent = rollups.summary(my_listings, today - timedelta(days=revenue_days - 1), today)
+
+    # Get bookings for spaces owned by the current user, a page at a time
+    status = request.GET.get('status')
+    bookings = Booking.objects.filter(parking_space__owner=request.user).select_related('parking_space', 'renter')
+    if status in dict(Booking.STATUS_CHOICES):
+        bookings = bookings.filter(status=status)
+    else:
+        status = None
+    page = keyset_page(
+        bookings, request.GET.get('cursor'), getattr(settings, "HOST_BOOKINGS_PAGE_SIZE", 25),
+        ordering=('status', '-created_at', '-pk'),
+    )
+
+    return render(request, 'marketplace/host_bookings.html', {
+        'bookings': page.items,
+        'rules': rules,
+        'page': page,
+        'status': status,
+        'status_choices': Booking.STATUS_CHOICES,
+        'my_listings': my_listings,
+        'totals': totals,
+        'window_days': window_days,
+        'recent': recent,
+        'revenue_days': revenue_days,
+    })
 
 @login_required
 def delete_parking_space(request, pk):
@@ -226,45 +421,146 @@ def delete_parking_space(request, pk):
 
 @login_required
 def approve_booking(request, booking_id):
-    booking = get_object_or_404(Booking, pk=booking_id, parking_space__owner=request.user)
-    
-    # Re-check conflicts before approving
-    conflicts = Booking.objects.filter(
-        parking_space=booking.parking_space,
-        status='approved',
-        start_datetime__lt=booking.end_datetime,
-        end_datetime__gt=booking.start_datetime
-    ).exclude(pk=booking.pk)
-    
-    if conflicts.exists():
-        messages.error(request, "Cannot approve: Conflict with another approved booking.")
+    if request.method == 'POST':
+        try:
+            approve(booking_id, request.user)
+        except Booking.DoesNotExist:
+            raise Http404("No Booking matches the given query.")
+        except BookingActionError as error:
+            messages.error(request, str(error))
+        else:
+            messages.success(request, "Booking approved.")
+
+    return redirect('host_bookings')
+
+BULK_RESULT_LABELS = {
+    'approved': "approved",
+    'declined': "declined",
+    'conflict': "skipped (conflict with an approved booking)",
+    'not_pending': "skipped (no longer pending)",
+    'not_found': "skipped (not found)",
+}
+
+@login_required
+def bulk_booking_action(request):
+    if request.method != 'POST':
+        return redirect('host_bookings')
+
+    action = request.POST.get('action')
+    try:
+        booking_ids = [int(value) for value in request.POST.getlist('booking_ids')]
+    except ValueError:
+        booking_ids = None
+    if action not in ('approve', 'decline') or not booking_ids:
+        if not request.accepts('text/html'):
+            return JsonResponse({'error': 'Choose an action and at least one booking.'}, status=400)
+        messages.error(request, "Choose an action and at least one booking.")
+        return redirect('host_bookings')
+
+    results = bulk_transition(booking_ids, request.user, action)
+
+    if not request.accepts('text/html'):
+        return JsonResponse({'results': {str(pk): result for pk, result in results.items()}})
+
+    counts = {}
+    for result in results.values():
+        counts[result] = counts.get(result, 0) + 1
+    summary = ", ".join(f"{count} {BULK_RESULT_LABELS[result]}" for result, count in counts.items())
+    if counts.get('approved') or counts.get('declined'):
+        messages.success(request, f"Bookings updated: {summary}.")
     else:
-        booking.status = 'approved'
-        booking.save()
-        messages.success(request, "Booking approved.")
-        
+        messages.error(request, f"No bookings updated: {summary}.")
+    return redirect('host_bookings')
+
+@login_required
+def approve_recurring_booking(request, rule_id):
+    if request.method == 'POST':
+        try:
+            approve_rule(rule_id, request.user)
+        except RecurringBooking.DoesNotExist:
+            raise Http404("No RecurringBooking matches the given query.")
+        except BookingActionError as error:
+            messages.error(request, str(error))
+        else:
+            messages.success(request, "Recurring booking approved.")
     return redirect('host_bookings')
 
 @login_required
+def decline_recurring_booking(request, rule_id):
+    if request.method == 'POST':
+        try:
+            decline_rule(rule_id, request.user)
+        except RecurringBooking.DoesNotExist:
+            raise Http404("No RecurringBooking matches the given query.")
+        messages.success(request, "Recurring booking declined.")
+    return redirect('host_bookings')
+
+@login_required
+@require_POST
 def decline_booking(request, booking_id):
-    booking = get_object_or_404(Booking, pk=booking_id, parking_space__owner=request.user)
-    booking.status = 'declined'
-    booking.save()
+    try:
+        decline(booking_id, request.user)
+    except Booking.DoesNotExist:
+        raise Http404("No Booking matches the given query.")
     messages.success(request, "Booking declined.")
     return redirect('host_bookings')
 
 @login_required
-def my_bookings(request):
-    bookings = Booking.objects.filter(renter=request.user).order_by('-created_at')
-    return render(request, 'marketplace/my_bookings.html', {'bookings': bookings})
+@freshness.acondition(etag_func=freshness.my_bookings_etag)
+async def my_bookings(request):
+    user = await request.auser()
+    if request.GET.get('history'):
+        # Archived bookings are only read when the renter asks for them, a page at a time
+        history = (
+            ArchivedBooking.objects.filter(renter=user)
+            .select_related('parking_space')
+            .prefetch_related(cover_images_prefetch('parking_space__images'))
+        )
+        page = await akeyset_page(history, request.GET.get('cursor'), getattr(settings, "BOOKING_HISTORY_PAGE_SIZE", 20))
+        return await sync_to_async(render)(request, 'marketplace/my_bookings.html', {
+            'bookings': page.items,
+            'page': page,
+            'history': True,
+        })
+
+    bookings = (
+        Booking.objects.filter(renter=user)
+        .select_related('parking_space')
+        .prefetch_related(cover_images_prefetch('parking_space__images'))
+        .order_by('-created_at')
+    )
+    bookings = [booking async for booking in bookings]
+    rules = (
+        RecurringBooking.objects.filter(renter=user, status__in=('pending', 'approved'))
+        .select_related('parking_space')
+        .prefetch_related(cover_images_prefetch('parking_space__images'))
+        .order_by('-pk')
+    )
+    rules = [rule async for rule in rules]
+    return await sync_to_async(render)(request, 'marketplace/my_bookings.html', {'bookings': bookings, 'rules': rules})
 
 @login_required
+@require_POST
 def cancel_booking(request, booking_id):
-    booking = get_object_or_404(Booking, pk=booking_id, renter=request.user)
-    if booking.status == 'pending':
-        booking.status = 'cancelled'
-        booking.save()
-        messages.success(request, "Booking request cancelled.")
+    try:
+        cancel(booking_id, request.user)
+    except Booking.DoesNotExist:
+        raise Http404("No Booking matches the given query.")
+    except BookingActionError as error:
+        messages.error(request, str(error))
     else:
-        messages.error(request, "Cannot cancel this booking.")
+        messages.success(request, "Booking request cancelled.")
+    return redirect('my_bookings')
+
+@login_required
+def cancel_recurring_booking(request, rule_id):
+    if request.method == 'POST':
+        try:
+            cancel_rule(rule_id, request.user)
+        except RecurringBooking.DoesNotExist:
+            raise Http404("No RecurringBooking matches the given query.")
+        except BookingActionError as error:
+            messages.error(request, str(error))
+        else:
+            messages.success(request, "Recurring booking cancelled.")
     return redirect('my_bookings')